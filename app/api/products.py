@@ -3,9 +3,15 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-
-from app.core.database import get_db
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, delete, exists, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, contains_eager
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import SessionLocal, get_db
 from app.models.product import Product  # noqa: F401
 from app.models.import_simulation import ImportSimulation
 from app.models.product_market_data import ProductMarketData
@@ -14,44 +20,128 @@ from app.schemas.simulation import SimulationInput, SimulationOut
 from app.schemas.market_data import MarketDataCreate, MarketDataOut
 from app.schemas.score import ProductScoreOut
 from app.services.exchange import fetch_usd_brl_rate
-from app.services.scoring import compute_product_score
+from app.services.simulation import compute_simulation, to_decimal
+from app.services.scoring import (
+    compute_product_score,
+    compute_product_score_from_objs,
+    invalidate_product_score,
+    ranking_score_subquery,
+)
 from app.schemas.evaluation import ProductEvaluationResponse
 from app.services.evaluation import compute_product_evaluation
 from app.models.product_decision import ProductDecision
+from app.models.product_evaluation import ProductEvaluation
 from app.schemas.decision import ProductDecisionCreate, ProductDecisionOut
 from app.schemas.triage import ProductTriageOut
-from app.services.triage import build_products_triage
+from app.services.triage import build_products_triage_async
 from app.core.database import get_db
 
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+_PRODUCTS_ADAPTER = TypeAdapter(List[ProductOut])
+_SCORES_ADAPTER = TypeAdapter(List[ProductScoreOut])
+_TRIAGE_ADAPTER = TypeAdapter(List[ProductTriageOut])
+
+# Dialetos com INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+_UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def get_product_or_404(product_id: int, db: Session = Depends(get_db)) -> Product:
+    """Dependência: carrega o produto do path ou responde 404."""
+    product = db.get(Product, product_id)
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Produto não encontrado.",
+        )
+    return product
+
+
+def _product_exists(db: Session, product_id: int) -> bool:
+    return db.scalar(select(exists().where(Product.id == product_id)))
+
+
+def ensure_product_exists(product_id: int, db: Session = Depends(get_db)) -> None:
+    """Dependência: só confere (EXISTS, sem carregar a linha) que o produto existe."""
+    if not _product_exists(db, product_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Produto não encontrado.",
+        )
+
+
+def _save(db: Session, obj):
+    db.add(obj)
+    db.commit()
+    return obj
+
 
 @router.get("/", response_model=List[ProductOut])
-def list_products(db: Session = Depends(get_db)):
+def list_products(
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+):
     """
-    Lista todos os produtos cadastrados.
+    Lista os produtos cadastrados (paginado, mais recentes primeiro).
+    Para exportar o catálogo inteiro use /products/export.
     """
-    products = db.query(Product).order_by(Product.id.desc()).all()
-    return products
+    products = db.execute(
+        select(Product).order_by(Product.id.desc()).limit(limit).offset(offset)
+    ).scalars().all()
+    # Validação em lote (pydantic-core) e JSON direto, sem a segunda
+    # passada de validação/serialização do response_model do FastAPI.
+    items = _PRODUCTS_ADAPTER.validate_python(products, from_attributes=True)
+    return Response(content=_PRODUCTS_ADAPTER.dump_json(items), media_type="application/json")
+
+
+@router.get("/export", response_model=List[ProductOut])
+def export_products():
+    """
+    Exporta todos os produtos como um array JSON em streaming,
+    lendo do banco em lotes (memória proporcional ao lote, não ao catálogo).
+    """
+    def _iter_json():
+        # Sessão própria: o corpo é gerado depois que o endpoint retorna.
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                select(Product)
+                .order_by(Product.id.desc())
+                .execution_options(yield_per=1000)
+            ).scalars()
+            yield "["
+            for i, product in enumerate(result):
+                if i:
+                    yield ","
+                yield ProductOut.model_validate(product).model_dump_json()
+            yield "]"
+        finally:
+            db.close()
+
+    return StreamingResponse(_iter_json(), media_type="application/json")
 
 
 @router.get("/triage", response_model=List[ProductTriageOut])
-def get_products_triage(
+async def get_products_triage(
     limit: int = Query(default=250, ge=1, le=500),
     include_score: bool = Query(default=True),
     include_notes: bool = Query(default=False),
     db: Session = Depends(get_db),
 ) -> List[ProductTriageOut]:
     try:
-        items = build_products_triage(
+        items = await build_products_triage_async(
             db,
             limit=limit,
             include_score=include_score,
             include_notes=include_notes,
         )
         # blindagem: NUNCA deixa retornar None
-        return items or []
+        # JSON direto do pydantic-core (payload grande: N produtos com score aninhado),
+        # também fora do event loop
+        content = await run_in_threadpool(_TRIAGE_ADAPTER.dump_json, items or [])
+        return Response(content=content, media_type="application/json")
     except Exception as e:
         # aqui você quer ver o erro de verdade, não mascarar com None
         raise HTTPException(status_code=500, detail=f"Failed to build triage: {e}")
@@ -74,33 +164,9 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
             detail="Já existe um produto com esse nome.",
         )
 
-    product = Product(
-        name=payload.name,
-        description=payload.description,
-        category=payload.category,
-        reference_marketplace_url=str(payload.reference_marketplace_url)
-        if payload.reference_marketplace_url
-        else None,
-        supplier_url=str(payload.supplier_url)
-        if payload.supplier_url
-        else None,
-        supplier_id=payload.supplier_id,
-        ncm_id=payload.ncm_id,
-        weight_kg=payload.weight_kg,
-        length_cm=payload.length_cm,
-        width_cm=payload.width_cm,
-        height_cm=payload.height_cm,
-        fragile=payload.fragile,
-        fob_price_usd=payload.fob_price_usd,
-        freight_usd=payload.freight_usd,
-        insurance_usd=payload.insurance_usd,
-        is_famous_brand=payload.is_famous_brand,
-        has_brand_authorization=payload.has_brand_authorization,
-    )
-
+    product = Product(**payload.model_dump())
     db.add(product)
     db.commit()
-    db.refresh(product)
 
     return product
 
@@ -111,14 +177,12 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
     status_code=status.HTTP_201_CREATED,
 )
 async def simulate_import_for_product(   # <-- agora async
-    product_id: int,
     payload: SimulationInput,
+    product: Product = Depends(get_product_or_404),
     db: Session = Depends(get_db),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produto não encontrado.")
-
+    # Session é síncrona: a dependência (sync) de carga do produto e a gravação
+    # rodam no threadpool para não bloquear o event loop deste endpoint async.
     if product.fob_price_usd is None:
         raise HTTPException(status_code=400, detail="Produto não possui FOB definido.")
 
@@ -126,8 +190,9 @@ async def simulate_import_for_product(   # <-- agora async
     target_price = payload.target_sale_price_brl
 
     # ✅ câmbio: se não veio no payload, pega do dia
-    exchange_rate = payload.exchange_rate
-    if exchange_rate is None:
+    if payload.exchange_rate is not None:
+        exchange_rate = float(payload.exchange_rate)
+    else:
         try:
             exchange_rate = await fetch_usd_brl_rate()
         except Exception as e:
@@ -136,98 +201,64 @@ async def simulate_import_for_product(   # <-- agora async
                 detail=f"Falha ao buscar dólar do dia: {e}",
             )
 
-    # FOB total (produto * quantidade)
-    fob_total_usd = product.fob_price_usd * quantity
-
     # Frete total: pode vir do payload ou usar frete unitário do produto
     if payload.freight_total_usd is not None:
-        freight_total_usd = payload.freight_total_usd
+        freight_total_usd = float(payload.freight_total_usd)
     else:
-        freight_total_usd = (product.freight_usd or 0) * quantity
+        freight_total_usd = float(product.freight_usd or 0) * quantity
 
     # Seguro total: pode vir do payload ou usar o unitário do produto
     if payload.insurance_total_usd is not None:
-        insurance_total_usd = payload.insurance_total_usd
+        insurance_total_usd = float(payload.insurance_total_usd)
     else:
-        insurance_total_usd = (product.insurance_usd or 0) * quantity
-
-    customs_value_usd = fob_total_usd + freight_total_usd + insurance_total_usd
+        insurance_total_usd = float(product.insurance_usd or 0) * quantity
 
-    # 3) Regra rápida: custo total ≈ custo aduaneiro * 2
-    estimated_total_cost_usd = customs_value_usd * 2
-    estimated_total_cost_brl = estimated_total_cost_usd * exchange_rate
-
-    unit_cost_brl = estimated_total_cost_brl / quantity
-
-    # 4) Margem em %
-    estimated_margin_pct = (target_price - unit_cost_brl) / target_price * 100
-
-    # 5) Regras de aprovação simples (você pode ajustar depois)
-    reasons = []
-    approved = True
-
-    # Limite da Importação Simplificada por operação (US$ 3.000 de valor aduaneiro)
-    if customs_value_usd > 3000:
-        approved = False
-        reasons.append("Excede o limite de US$ 3.000 de valor aduaneiro por remessa.")
-
-    # Margem mínima (ex.: 35%)
-    MIN_MARGIN = 35
-    if estimated_margin_pct < MIN_MARGIN:
-        approved = False
-        reasons.append(f"Margem abaixo de {MIN_MARGIN}%.")
-
-    reason_text = " ".join(reasons) if reasons else "Aprovado nos critérios definidos."
-
-    # 6) Salvar a simulação no banco
-    simulation = ImportSimulation(
-        product_id=product.id,
+    # Decimals convertidos uma vez; a conta toda roda em float
+    calc = compute_simulation(
         quantity=quantity,
         exchange_rate=exchange_rate,
-        fob_total_usd=fob_total_usd,
+        target_sale_price_brl=float(target_price),
+        fob_unit_usd=float(product.fob_price_usd),
         freight_total_usd=freight_total_usd,
         insurance_total_usd=insurance_total_usd,
-        customs_value_usd=customs_value_usd,
-        estimated_total_cost_usd=estimated_total_cost_usd,
-        estimated_total_cost_brl=estimated_total_cost_brl,
-        unit_cost_brl=unit_cost_brl,
-        target_sale_price_brl=target_price,
-        estimated_margin_pct=estimated_margin_pct,
-        approved=approved,
-        reason=reason_text,
     )
 
-    db.add(simulation)
-    db.commit()
-    db.refresh(simulation)
+    # Salvar a simulação no banco (Decimal na escala de cada coluna, para que
+    # o objeto devolvido sem refresh tenha os mesmos valores gravados)
+    simulation = ImportSimulation(
+        product_id=product.id,
+        quantity=quantity,
+        exchange_rate=to_decimal(exchange_rate, 4),
+        fob_total_usd=to_decimal(calc.fob_total_usd, 4),
+        freight_total_usd=to_decimal(calc.freight_total_usd, 4),
+        insurance_total_usd=to_decimal(calc.insurance_total_usd, 4),
+        customs_value_usd=to_decimal(calc.customs_value_usd, 4),
+        estimated_total_cost_usd=to_decimal(calc.estimated_total_cost_usd, 4),
+        estimated_total_cost_brl=to_decimal(calc.estimated_total_cost_brl, 4),
+        unit_cost_brl=to_decimal(calc.unit_cost_brl, 4),
+        target_sale_price_brl=to_decimal(float(target_price), 4),
+        estimated_margin_pct=to_decimal(calc.estimated_margin_pct, 2),
+        approved=calc.approved,
+        reason=calc.reason,
+    )
+
+    await run_in_threadpool(_save, db, simulation)
+    invalidate_product_score(product.id)
 
     return simulation
 
 
 @router.get("/{product_id}", response_model=ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
+def get_product(product: Product = Depends(get_product_or_404)):
     return product
 
 
 @router.put("/{product_id}", response_model=ProductOut)
 def update_product(
-    product_id: int,
     payload: ProductUpdate,
+    product: Product = Depends(get_product_or_404),
     db: Session = Depends(get_db),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
-
     # Pydantic v2: model_dump(exclude_unset=True)
     data = payload.model_dump(exclude_unset=True)
 
@@ -237,29 +268,32 @@ def update_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    invalidate_product_score(product.id)
 
     return product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    # Sem SELECT prévio: apaga os dependentes e o produto direto;
+    # rowcount == 0 significa que o produto não existia.
+    db.execute(delete(ImportSimulation).where(ImportSimulation.product_id == product_id))
+    db.execute(delete(ProductMarketData).where(ProductMarketData.product_id == product_id))
+    db.execute(delete(ProductDecision).where(ProductDecision.product_id == product_id))
+    # As FKs não têm ON DELETE CASCADE nos bancos já criados (create_all não
+    # altera tabelas), então os dependentes saem aqui, um DELETE por tabela.
+    db.execute(delete(ProductEvaluation).where(ProductEvaluation.product_id == product_id))
+
+    deleted = db.execute(delete(Product).where(Product.id == product_id)).rowcount
+    if not deleted:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Produto não encontrado.",
         )
 
-    # 1) Apagar antes as simulações vinculadas
-    db.query(ImportSimulation).filter(
-        ImportSimulation.product_id == product_id
-    ).delete(synchronize_session=False)
-
-    # (se você tiver avaliações ligadas a produto, pode fazer algo similar aqui)
-
-    # 2) Agora apagar o produto
-    db.delete(product)
     db.commit()
+    invalidate_product_score(product_id)
 
     return None
 
@@ -267,15 +301,9 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
 @router.get(
     "/{product_id}/market-data",
     response_model=MarketDataOut,
+    dependencies=[Depends(ensure_product_exists)],
 )
 def get_market_data(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
-
     market = (
         db.query(ProductMarketData)
         .filter(ProductMarketData.product_id == product_id)
@@ -294,6 +322,7 @@ def get_market_data(product_id: int, db: Session = Depends(get_db)):
     "/{product_id}/market-data",
     response_model=MarketDataOut,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ensure_product_exists)],
 )
 def upsert_market_data(
     product_id: int,
@@ -304,12 +333,21 @@ def upsert_market_data(
     Cria ou atualiza os dados de mercado de um produto.
     Você vai preencher manualmente com base no Avant Pro.
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
+    data = payload.model_dump(exclude_unset=True)
+
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        # Um único statement: product_id é unique e serve de alvo do conflito.
+        # Sem campos enviados, o SET vazio vira um no-op para ainda devolver a linha.
+        stmt = insert(ProductMarketData).values(product_id=product_id, **data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductMarketData.product_id],
+            set_=data or {"product_id": product_id},
+        ).returning(ProductMarketData)
+        market = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+        db.commit()
+        invalidate_product_score(product_id)
+        return market
 
     market = (
         db.query(ProductMarketData)
@@ -317,8 +355,6 @@ def upsert_market_data(
         .first()
     )
 
-    data = payload.model_dump(exclude_unset=True)
-
     if market is None:
         market = ProductMarketData(product_id=product_id, **data)
         db.add(market)
@@ -327,7 +363,7 @@ def upsert_market_data(
             setattr(market, field, value)
 
     db.commit()
-    db.refresh(market)
+    invalidate_product_score(product_id)
 
     return market
 
@@ -335,6 +371,7 @@ def upsert_market_data(
 @router.get(
     "/{product_id}/score",
     response_model=ProductScoreOut,
+    dependencies=[Depends(ensure_product_exists)],
 )
 def get_product_score(product_id: int, db: Session = Depends(get_db)):
     """
@@ -343,13 +380,6 @@ def get_product_score(product_id: int, db: Session = Depends(get_db)):
     - última simulação de importação
     - atributos de risco (peso, marca, fragilidade)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
-
     result, notes = compute_product_score(db, product_id)
 
     return ProductScoreOut(
@@ -362,56 +392,70 @@ def get_product_score(product_id: int, db: Session = Depends(get_db)):
     "/scores/ranking",
     response_model=List[ProductScoreOut],
 )
-def get_products_ranking(limit: int = 20, db: Session = Depends(get_db)):
+def get_products_ranking(
+    limit: int = Query(default=20, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
     """
     Retorna os produtos ordenados pelo score de viabilidade.
     Útil para decidir quais importar primeiro.
     """
-    products = db.query(Product).all()
+    # Uma única consulta: produto + mercado + última simulação, já ordenada
+    # pelo score inteiro calculado no banco (o mesmo do Python, desempate
+    # por id); só o top N é hidratado.
+    ranking = ranking_score_subquery()
+    query = (
+        db.query(Product, ImportSimulation)
+        .join(ranking, ranking.c.product_id == Product.id)
+        .outerjoin(Product.market_data)
+        .outerjoin(ImportSimulation, ImportSimulation.id == ranking.c.simulation_id)
+        .options(contains_eager(Product.market_data))
+        .order_by(ranking.c.total_score.desc(), Product.id)
+    )
     scores: list[ProductScoreOut] = []
-
-    for p in products:
-        try:
-            result, notes = compute_product_score(db, p.id)
-            scores.append(
-                ProductScoreOut(
-                    **result,
-                    notes=" ".join(notes),
+    offset = 0
+
+    # Só volta ao banco se algum produto do top N falhar no score
+    while len(scores) < limit:
+        wanted = limit - len(scores)
+        rows = query.offset(offset).limit(wanted).all()
+        offset += len(rows)
+
+        for p, last_sim in rows:
+            try:
+                result, notes = compute_product_score_from_objs(p, p.market_data, last_sim)
+                scores.append(
+                    ProductScoreOut(
+                        **result,
+                        notes=" ".join(notes),
+                    )
                 )
-            )
-        except Exception:
-            # se der erro para um produto (dados inconsistentes), simplesmente pula
-            continue
+            except Exception:
+                # se der erro para um produto (dados inconsistentes), simplesmente pula
+                continue
 
-    # ordena do maior score para o menor
-    scores.sort(key=lambda s: s.total_score, reverse=True)
+        if len(rows) < wanted:
+            break
 
-    return scores[:limit]
+    return Response(content=_SCORES_ADAPTER.dump_json(scores), media_type="application/json")
 
 
 
 @router.get(
     "/{product_id}/simulations/last",
     response_model=SimulationOut,
+    dependencies=[Depends(ensure_product_exists)],
 )
 def get_last_simulation(product_id: int, db: Session = Depends(get_db)):
     """
     Retorna a simulação de importação mais recente para o produto.
     Útil para mostrar o custo unitário, margem, aprovação, etc.
     """
-    # Confere se o produto existe
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Produto não encontrado.",
-        )
-
     # Busca a última simulação pela data de criação
     last_sim = (
         db.query(ImportSimulation)
         .filter(ImportSimulation.product_id == product_id)
-        .order_by(ImportSimulation.created_at.desc())
+        .order_by(ImportSimulation.created_at.desc(), ImportSimulation.id.desc())
         .first()
     )
 
@@ -426,8 +470,7 @@ def get_last_simulation(product_id: int, db: Session = Depends(get_db)):
 
 @router.get("/{product_id}/evaluation", response_model=ProductEvaluationResponse)
 def get_product_evaluation(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    if not _product_exists(db, product_id):
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
@@ -442,8 +485,7 @@ def create_product_decision(
     payload: ProductDecisionCreate,
     db: Session = Depends(get_db),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    if not _product_exists(db, product_id):
         raise HTTPException(status_code=404, detail="Product not found")
 
     decision = ProductDecision(
@@ -454,20 +496,18 @@ def create_product_decision(
     )
     db.add(decision)
     db.commit()
-    db.refresh(decision)
     return decision
 
 
 @router.get("/{product_id}/decisions/last", response_model=ProductDecisionOut)
 def get_last_product_decision(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    if not _product_exists(db, product_id):
         raise HTTPException(status_code=404, detail="Product not found")
 
     decision = (
         db.query(ProductDecision)
         .filter(ProductDecision.product_id == product_id)
-        .order_by(ProductDecision.created_at.desc())
+        .order_by(ProductDecision.created_at.desc(), ProductDecision.id.desc())
         .first()
     )
     if not decision:
@@ -1,24 +1,27 @@
 # app/core/config.py
 
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from pathlib import Path
 
-# Caminho da raiz do projeto (onde está o main.py e o .env)
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-ENV_PATH = os.path.join(BASE_DIR, ".env")
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-# Carrega variáveis do arquivo .env, se existir
-if os.path.exists(ENV_PATH):
-    load_dotenv(ENV_PATH)
+# Raiz do projeto (onde está o main.py e o .env)
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
 
 
-class Settings:
-    def __init__(self) -> None:
-        # Para começar, vamos usar SQLite por padrão se não houver .env
-        self.DATABASE_URL: str = os.getenv(
-            "DATABASE_URL",
-            "sqlite:///./mannaalive.db",
-        )
+class Settings(BaseSettings):
+    # Para começar, vamos usar SQLite por padrão se não houver .env
+    DATABASE_URL: str = "sqlite:///./mannaalive.db"
 
+    # create_all no startup: prático no SQLite local; em deploy com vários
+    # workers, desligue (AUTO_CREATE_TABLES=false) e crie o schema no deploy
+    AUTO_CREATE_TABLES: bool = True
 
-settings = Settings()
+    # .env é opcional; variáveis de ambiente têm prioridade sobre ele
+    model_config = SettingsConfigDict(env_file=ENV_PATH, extra="ignore")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings lidas uma vez por processo (testes podem usar get_settings.cache_clear())."""
+    return Settings()
@@ -1,27 +1,54 @@
 # app/core/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import settings
+from app.core.config import get_settings
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+SQLALCHEMY_DATABASE_URL = get_settings().DATABASE_URL
 
 # Para SQLite, é importante usar connect_args={"check_same_thread": False}
 if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # Banco em memória só existe dentro da conexão: StaticPool reaproveita
+    # a mesma conexão entre threads em vez de criar um banco vazio por thread.
+    in_memory = make_url(SQLALCHEMY_DATABASE_URL).database in (None, "", ":memory:")
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
+        poolclass=StaticPool if in_memory else None,
         echo=False,
         future=True,
     )
+
+    # WAL + synchronous=NORMAL: commits sem fsync a cada escrita e leitores
+    # não bloqueiam o escritor (simulações gravam a cada chamada).
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
 else:
+    # Pool explícito: o padrão (5) limita a concorrência do threadpool do FastAPI;
+    # pre_ping/recycle evitam conexões mortas; LIFO mantém as conexões quentes.
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
+        pool_size=20,
+        max_overflow=20,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_use_lifo=True,
         echo=False,
         future=True,
     )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: depois do commit o objeto mantém os valores já
+# conhecidos (PK e defaults vêm no próprio INSERT), sem SELECT de refresh.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,4 +1,23 @@
 # app/models/__init__.py
 
-# Esse arquivo apenas marca a pasta "models" como um pacote Python.
-# Vamos importar os models diretamente nos arquivos que precisam deles.
+# Registra todos os models no Base.metadata de uma vez: importar qualquer
+# app.models.X já traz o conjunto completo (relationships por nome resolvem).
+from app.models.supplier import Supplier
+from app.models.ncm import Ncm
+from app.models.product_decision import ProductDecision
+from app.models.product import Product
+from app.models.product_market_data import ProductMarketData
+from app.models.product_evaluation import ProductEvaluation
+from app.models.import_simulation import ImportSimulation
+from app.models.import_operation import ImportOperation
+
+__all__ = [
+    "Supplier",
+    "Ncm",
+    "ProductDecision",
+    "Product",
+    "ProductMarketData",
+    "ProductEvaluation",
+    "ImportSimulation",
+    "ImportOperation",
+]
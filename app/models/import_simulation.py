@@ -9,6 +9,7 @@ from sqlalchemy import (
     String,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -42,3 +43,9 @@ class ImportSimulation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     product = relationship("Product", back_populates="simulations")
+
+    # "última simulação do produto" (created_at, id como desempate) vira um
+    # seek no índice (sem sort)
+    __table_args__ = (
+        Index("ix_simulations_product_created", "product_id", created_at.desc(), id.desc()),
+    )
@@ -11,6 +11,8 @@ from app.core.database import Base
 
 class ProductDecision(Base):
     __tablename__ = "product_decisions"
+    # Busca created_at (server_default) no próprio INSERT (RETURNING), sem refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"), index=True, nullable=False)
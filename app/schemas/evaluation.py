@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 
 from app.schemas.decision import ProductDecisionOut
 
@@ -13,7 +14,11 @@ Decision = Literal["approve", "reject", "needs_data"]
 ScenarioKind = Literal["base", "conservative", "optimistic"]
 
 
-class Metric(BaseModel):
+# Metric, Pillar, CompletenessItem e Blocker só saem na resposta (nunca são
+# entrada): dataclasses com slots, bem mais baratas de criar que BaseModel.
+# O pydantic serializa normalmente como campos do ProductEvaluationResponse.
+@dataclass(slots=True, frozen=True)
+class Metric:
     key: str
     label: str
     value: Optional[float] = None
@@ -21,16 +26,18 @@ class Metric(BaseModel):
     help: Optional[str] = None
 
 
-class Pillar(BaseModel):
+@dataclass(slots=True, frozen=True)
+class Pillar:
     key: Literal["market", "unit_economics", "operations", "risk"]
     title: str
     status: PillarStatus
     summary: str
     next_action: Optional[str] = None
-    metrics: list[Metric] = Field(default_factory=list)
+    metrics: list[Metric] = field(default_factory=list)
 
 
-class CompletenessItem(BaseModel):
+@dataclass(slots=True, frozen=True)
+class CompletenessItem:
     key: str
     label: str
     is_complete: bool
@@ -42,7 +49,8 @@ class Completeness(BaseModel):
     missing: list[str] = Field(default_factory=list)
 
 
-class Blocker(BaseModel):
+@dataclass(slots=True, frozen=True)
+class Blocker:
     key: str
     title: str
     reason: str
@@ -95,6 +103,31 @@ class ScenarioResult(BaseModel):
     approved: bool
     reason: Optional[str] = None
 
+    # A conta guarda precisão total; arredonda só ao gerar o JSON
+    @field_serializer(
+        "fob_total_usd",
+        "freight_total_usd",
+        "insurance_total_usd",
+        "customs_value_usd",
+        "estimated_total_cost_usd",
+        "estimated_total_cost_brl",
+        "unit_cost_brl",
+        "target_sale_price_brl",
+        "net_sale_price_brl",
+        "profit_unit_brl",
+        "profit_total_brl",
+        "roi_unit_pct",
+        "roi_total_pct",
+        "estimated_margin_pct",
+        when_used="json",
+    )
+    def _round_2(self, value: float) -> float:
+        return round(value, 2)
+
+    @field_serializer("payback_days", when_used="json")
+    def _round_payback(self, value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value else None
+
 
 class EvaluationHeader(BaseModel):
     product_id: int
@@ -138,3 +171,12 @@ class ProductEvaluationResponse(BaseModel):
 
     blockers: list[Blocker] = Field(default_factory=list)
     notes: list[str] = Field(default_factory=list)
+
+
+# Garante os schemas completos já no import (e não na primeira avaliação);
+# ProductEvaluationResponse por último, depois dos modelos aninhados
+Completeness.model_rebuild()
+ScenarioResult.model_rebuild()
+EvaluationHeader.model_rebuild()
+ScoreSummary.model_rebuild()
+ProductEvaluationResponse.model_rebuild()
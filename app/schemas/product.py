@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from pydantic import BaseModel, HttpUrl, ConfigDict
+from pydantic import BaseModel, HttpUrl, ConfigDict, field_serializer
 
 
 class ProductBase(BaseModel):
@@ -35,6 +35,11 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     name: str
 
+    # No model_dump() as URLs já saem como str, prontas para as colunas do Product
+    @field_serializer("reference_marketplace_url", "supplier_url", when_used="always")
+    def _url_to_str(self, value: Optional[HttpUrl]) -> Optional[str]:
+        return str(value) if value else None
+
 
 class ProductUpdate(ProductBase):
     pass
@@ -45,5 +50,15 @@ class ProductOut(ProductBase):
     created_at: datetime
     updated_at: datetime
 
+    # Só resposta: float evita o validador de Decimal em cada linha da listagem
+    weight_kg: Optional[float] = None
+    length_cm: Optional[float] = None
+    width_cm: Optional[float] = None
+    height_cm: Optional[float] = None
+
+    fob_price_usd: Optional[float] = None
+    freight_usd: Optional[float] = None
+    insurance_usd: Optional[float] = None
+
     # Pydantic v2:
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -1,6 +1,5 @@
 # app/schemas/score.py
 
-from decimal import Decimal
 from typing import Optional
 
 from pydantic import BaseModel, ConfigDict
@@ -24,8 +23,8 @@ class ProductScoreOut(BaseModel):
     sales_per_day: Optional[int] = None
     sales_per_month: Optional[int] = None
     visits: Optional[int] = None
-    price_average_brl: Optional[Decimal] = None
-    estimated_margin_pct: Optional[Decimal] = None
+    price_average_brl: Optional[float] = None
+    estimated_margin_pct: Optional[float] = None
     has_latest_simulation: bool = False
 
-    model_config = ConfigDict(from_attributes=False)
+    model_config = ConfigDict(from_attributes=False, frozen=True)
@@ -18,25 +18,26 @@ class SimulationInput(BaseModel):
 
 class SimulationOut(BaseModel):
     # Pydantic v2: substitui o antigo orm_mode = True
-    model_config = ConfigDict(from_attributes=True)
+    # Só resposta: valores em float (a conta em Decimal fica na entrada/banco)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
     id: int
     product_id: int
 
     quantity: int
-    exchange_rate: Decimal
+    exchange_rate: float
 
-    fob_total_usd: Decimal
-    freight_total_usd: Decimal
-    insurance_total_usd: Decimal
-    customs_value_usd: Decimal
+    fob_total_usd: float
+    freight_total_usd: float
+    insurance_total_usd: float
+    customs_value_usd: float
 
-    estimated_total_cost_usd: Decimal
-    estimated_total_cost_brl: Decimal
-    unit_cost_brl: Decimal
+    estimated_total_cost_usd: float
+    estimated_total_cost_brl: float
+    unit_cost_brl: float
 
-    target_sale_price_brl: Decimal
-    estimated_margin_pct: Decimal
+    target_sale_price_brl: float
+    estimated_margin_pct: float
 
     approved: bool
     reason: Optional[str] = None
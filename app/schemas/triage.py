@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 from datetime import datetime
-from decimal import Decimal
 from typing import List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict
@@ -24,9 +23,9 @@ class SimulationSummaryOut(BaseModel):
     created_at: datetime
     approved: bool
 
-    unit_cost_brl: Decimal
-    target_sale_price_brl: Decimal
-    estimated_margin_pct: Decimal
+    unit_cost_brl: float
+    target_sale_price_brl: float
+    estimated_margin_pct: float
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -44,9 +43,9 @@ class ScoreSummaryOut(BaseModel):
     sales_per_month: Optional[int] = None
     visits: Optional[int] = None
     competitor_count: Optional[int] = None
-    full_ratio: Optional[Decimal] = None
-    price_average_brl: Optional[Decimal] = None
-    estimated_margin_pct: Optional[Decimal] = None
+    full_ratio: Optional[float] = None
+    price_average_brl: Optional[float] = None
+    estimated_margin_pct: Optional[float] = None
     has_latest_simulation: bool = False
 
     reasons: List[str] = []
@@ -61,9 +60,9 @@ class ProductTriageOut(BaseModel):
     category: Optional[str] = None
     created_at: datetime
 
-    fob_price_usd: Optional[Decimal] = None
-    freight_usd: Optional[Decimal] = None
-    insurance_usd: Optional[Decimal] = None
+    fob_price_usd: Optional[float] = None
+    freight_usd: Optional[float] = None
+    insurance_usd: Optional[float] = None
 
     has_fob: bool
     has_freight: bool
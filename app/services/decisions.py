@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from sqlalchemy import exists, select
 from sqlalchemy.orm import Session
 
 from app.models.product import Product
@@ -8,8 +9,7 @@ from app.schemas.decision import ProductDecisionCreate
 
 
 def create_product_decision(db: Session, product_id: int, payload: ProductDecisionCreate) -> ProductDecision:
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product is None:
+    if not db.scalar(select(exists().where(Product.id == product_id))):
         raise ValueError("Product not found")
 
     decision = ProductDecision(
@@ -20,7 +20,7 @@ def create_product_decision(db: Session, product_id: int, payload: ProductDecisi
     )
     db.add(decision)
     db.commit()
-    db.refresh(decision)
+    # created_at (server_default) já volta no RETURNING do INSERT (eager_defaults)
     return decision
 
 
@@ -28,6 +28,6 @@ def get_latest_product_decision(db: Session, product_id: int) -> ProductDecision
     return (
         db.query(ProductDecision)
         .filter(ProductDecision.product_id == product_id)
-        .order_by(ProductDecision.created_at.desc())
+        .order_by(ProductDecision.created_at.desc(), ProductDecision.id.desc())
         .first()
     )
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Dict, Iterable, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased, joinedload, load_only
 
 from app.models.product import Product
 from app.models.product_decision import ProductDecision
@@ -20,7 +21,7 @@ from app.schemas.evaluation import (
     ProductEvaluationResponse,
     ScenarioResult, ScoreSummary,
 )
-from app.services.scoring import compute_product_score_v2
+from app.services.scoring import compute_product_score_v2_from_objs, latest_id_subquery
 
 
 @dataclass(frozen=True)
@@ -34,22 +35,45 @@ class EvalConfig:
     local_cost_brl: float = 3.0     # embalagem / perdas / etc por unidade
 
 
-def _safe_float(value) -> Optional[float]:
-    if value is None:
-        return None
-    try:
-        return float(value)
-    except Exception:
-        return None
+# Só constantes e imutável: uma instância para todas as avaliações
+_DEFAULT_EVAL_CONFIG = EvalConfig()
+
+# Cenários como multiplicadores sobre a base, sempre nesta ordem:
+# (kind, nome, quantidade, qtd. mínima, câmbio, preço alvo, FOB, frete, seguro)
+_SCENARIO_SPECS = (
+    ("base", "Base", 1.0, 1, 1.0, 1.0, 1.0, 1.0, 1.0),
+    # câmbio pior, preço menor, FOB e frete piores
+    ("conservative", "Conservador", 0.6, 50, 1.05, 0.95, 1.03, 1.15, 1.1),
+    ("optimistic", "Otimista", 1.3, 1, 0.97, 1.03, 0.98, 0.95, 0.95),
+)
 
 
-def _latest_simulation(db: Session, product_id: int) -> Optional[ImportSimulation]:
-    return (
-        db.query(ImportSimulation)
-        .filter(ImportSimulation.product_id == product_id)
-        .order_by(ImportSimulation.created_at.desc())
-        .first()
-    )
+def _safe_float(value) -> Optional[float]:
+    # Só recebe colunas Numeric/Integer do ORM (Decimal/int/None): float() não falha
+    return None if value is None else float(value)
+
+
+# Colunas do Product que a avaliação (e o score) realmente lê: descrição e URLs
+# (texto livre) ficam fora do SELECT
+_EVALUATION_PRODUCT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.category,
+    Product.supplier_id,
+    Product.ncm_id,
+    Product.weight_kg,
+    Product.length_cm,
+    Product.width_cm,
+    Product.height_cm,
+    Product.fragile,
+    Product.fob_price_usd,
+    Product.freight_usd,
+    Product.insurance_usd,
+    Product.is_famous_brand,
+    Product.has_brand_authorization,
+    Product.created_at,
+    Product.updated_at,
+)
 
 
 def _estimate_total_cost_usd(customs_value_usd: float) -> float:
@@ -57,16 +81,28 @@ def _estimate_total_cost_usd(customs_value_usd: float) -> float:
     return customs_value_usd * 2.0
 
 
-def _latest_decision(db: Session, product_id: int) -> Optional[ProductDecision]:
+def _load_product_with_latest(
+    db: Session, product_id: int
+) -> Optional[tuple[Product, Optional[ImportSimulation], Optional[ProductDecision]]]:
+    """
+    Produto + última simulação + última decisão em um único round-trip.
+    market_data (1:1) e ncm (N:1) vêm no mesmo SELECT, em vez de um lazy
+    load para cada relação acessada depois.
+    """
     return (
-        db.query(ProductDecision)
-        .filter(ProductDecision.product_id == product_id)
-        .order_by(ProductDecision.created_at.desc())
+        db.query(Product, ImportSimulation, ProductDecision)
+        .options(
+            load_only(*_EVALUATION_PRODUCT_COLUMNS),
+            joinedload(Product.market_data),
+            joinedload(Product.ncm),
+        )
+        .outerjoin(ImportSimulation, ImportSimulation.id == latest_id_subquery(ImportSimulation))
+        .outerjoin(ProductDecision, ProductDecision.id == latest_id_subquery(ProductDecision))
+        .filter(Product.id == product_id)
         .first()
     )
 
 
-
 def _scenario_calc(
     *,
     kind: str,
@@ -80,12 +116,15 @@ def _scenario_calc(
     config: EvalConfig,
     sales_per_day: Optional[float] = None,
 ) -> ScenarioResult:
-    fob_total_usd = fob_unit_usd * float(quantity)
+    # Escalar de propósito: são só 3 cenários, e arrays (NumPy) custariam
+    # mais para montar do que a conta em si; a quantidade vira float uma vez.
+    qty = float(quantity)
+    fob_total_usd = fob_unit_usd * qty
     customs_value_usd = fob_total_usd + freight_total_usd + insurance_total_usd
 
     estimated_total_cost_usd = customs_value_usd * 2.0
     estimated_total_cost_brl = estimated_total_cost_usd * exchange_rate
-    unit_cost_brl = estimated_total_cost_brl / float(quantity)
+    unit_cost_brl = estimated_total_cost_brl / qty
 
     # 🔥 Receita líquida
     total_fee_pct = config.ml_fee_pct + config.ads_pct
@@ -93,10 +132,10 @@ def _scenario_calc(
 
     # 🔥 Lucro
     profit_unit_brl = net_sale_price_brl - unit_cost_brl - config.local_cost_brl
-    profit_total_brl = profit_unit_brl * quantity
+    profit_total_brl = profit_unit_brl * qty
 
     # 🔥 ROI
-    capital_total_brl = unit_cost_brl * quantity
+    capital_total_brl = unit_cost_brl * qty
     roi_unit_pct = (profit_unit_brl / unit_cost_brl * 100) if unit_cost_brl > 0 else -100.0
     roi_total_pct = (profit_total_brl / capital_total_brl * 100) if capital_total_brl > 0 else -100.0
 
@@ -122,48 +161,141 @@ def _scenario_calc(
         approved = False
         reason = f"Margem abaixo de {config.min_margin_pct_conservative:.0f}% no conservador."
 
-    return ScenarioResult(
+    return ScenarioResult.model_construct(
         kind=kind,
         name=name,
         quantity=quantity,
         exchange_rate=exchange_rate,
-        fob_total_usd=round(fob_total_usd, 2),
-        freight_total_usd=round(freight_total_usd, 2),
-        insurance_total_usd=round(insurance_total_usd, 2),
-        customs_value_usd=round(customs_value_usd, 2),
-        estimated_total_cost_usd=round(estimated_total_cost_usd, 2),
-        estimated_total_cost_brl=round(estimated_total_cost_brl, 2),
-        unit_cost_brl=round(unit_cost_brl, 2),
-        target_sale_price_brl=round(target_sale_price_brl, 2),
-        net_sale_price_brl=round(net_sale_price_brl, 2),
-        profit_unit_brl=round(profit_unit_brl, 2),
-        profit_total_brl=round(profit_total_brl, 2),
-        roi_unit_pct=round(roi_unit_pct, 2),
-        roi_total_pct=round(roi_total_pct, 2),
-        payback_days=round(payback_days, 1) if payback_days else None,
-        estimated_margin_pct=round(margin_pct, 2),
+        fob_total_usd=fob_total_usd,
+        freight_total_usd=freight_total_usd,
+        insurance_total_usd=insurance_total_usd,
+        customs_value_usd=customs_value_usd,
+        estimated_total_cost_usd=estimated_total_cost_usd,
+        estimated_total_cost_brl=estimated_total_cost_brl,
+        unit_cost_brl=unit_cost_brl,
+        target_sale_price_brl=target_sale_price_brl,
+        net_sale_price_brl=net_sale_price_brl,
+        profit_unit_brl=profit_unit_brl,
+        profit_total_brl=profit_total_brl,
+        roi_unit_pct=roi_unit_pct,
+        roi_total_pct=roi_total_pct,
+        payback_days=payback_days,
+        estimated_margin_pct=margin_pct,
         approved=approved,
         reason=reason,
     )
 
 
-def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluationResponse:
-    config = EvalConfig()
+def _latest_by_product(db: Session, model, product_ids: list[int]) -> dict:
+    """Map product_id -> linha mais recente de `model` (ROW_NUMBER), só para os ids pedidos."""
+    ranked = (
+        select(
+            model,
+            func.row_number()
+            .over(
+                partition_by=model.product_id,
+                order_by=(model.created_at.desc(), model.id.desc()),
+            )
+            .label("rn"),
+        )
+        .where(model.product_id.in_(product_ids))
+        .subquery()
+    )
+    latest = aliased(model, ranked)
+    rows = db.scalars(select(latest).where(ranked.c.rn == 1)).all()
+    return {r.product_id: r for r in rows}
+
+
+def _score_summary(score_fn: Callable, *args) -> Optional[ScoreSummary]:
+    try:
+        # notes não entram no ScoreSummary
+        score_dict, _notes, reasons = score_fn(*args, include_notes=False)
+    except Exception:
+        return None
+    return ScoreSummary.model_construct(
+        total_score=score_dict["total_score"],
+        classification=score_dict["classification"],
+        demand_score=score_dict["demand_score"],
+        competition_score=score_dict["competition_score"],
+        margin_score=score_dict["margin_score"],
+        risk_score=score_dict["risk_score"],
+        reasons=reasons,
+    )
+
 
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product is None:
+def compute_product_evaluation(
+    db: Session, product_id: int, config: EvalConfig = _DEFAULT_EVAL_CONFIG
+) -> ProductEvaluationResponse:
+    row = _load_product_with_latest(db, product_id)
+    if row is None:
         raise ValueError("Product not found")
+    product, last_sim, last_decision = row
+
+    # Score com os objetos já carregados acima (sem recarregar produto/mercado/simulação)
+    score_out = _score_summary(
+        compute_product_score_v2_from_objs, product, product.market_data, last_sim
+    )
+    return _build_evaluation(product, last_sim, last_decision, score_out, config)
+
+
+def compute_product_evaluations_bulk(
+    db: Session, product_ids: Iterable[int], config: EvalConfig = _DEFAULT_EVAL_CONFIG
+) -> Dict[int, ProductEvaluationResponse]:
+    """
+    Avalia vários produtos com 3 queries no total (produtos + relações 1:1/N:1,
+    últimas simulações, últimas decisões), em vez de várias por produto.
+    Ids inexistentes ficam de fora do dict.
+    """
+    ids = list(set(product_ids))
+    if not ids:
+        return {}
+
+    products = db.scalars(
+        select(Product)
+        .options(
+            load_only(*_EVALUATION_PRODUCT_COLUMNS),
+            joinedload(Product.market_data),
+            joinedload(Product.ncm),
+        )
+        .where(Product.id.in_(ids))
+    ).all()
+    sim_map = _latest_by_product(db, ImportSimulation, ids)
+    decision_map = _latest_by_product(db, ProductDecision, ids)
+
+    out: Dict[int, ProductEvaluationResponse] = {}
+    for product in products:
+        last_sim = sim_map.get(product.id)
+        score_out = _score_summary(
+            compute_product_score_v2_from_objs, product, product.market_data, last_sim
+        )
+        out[product.id] = _build_evaluation(
+            product, last_sim, decision_map.get(product.id), score_out, config
+        )
+    return out
 
+
+def _build_evaluation(
+    product: Product,
+    last_sim: Optional[ImportSimulation],
+    last_decision: Optional[ProductDecision],
+    score_out: Optional[ScoreSummary],
+    config: EvalConfig,
+) -> ProductEvaluationResponse:
+    # Tudo abaixo é montado aqui mesmo, com tipos já corretos: os BaseModels de
+    # resposta usam model_construct (sem validação); o ORM passa por model_validate.
     market: Optional[ProductMarketData] = product.market_data  # 1:1 (pode ser None)
-    last_sim = _latest_simulation(db, product_id)
 
     # Completeness (checklist objetivo)
     has_market_data = market is not None
     has_ncm = product.ncm_id is not None
     has_supplier = product.supplier_id is not None
-    has_dimensions = all(
-        v is not None and float(v) > 0
-        for v in [product.weight_kg, product.length_cm, product.width_cm, product.height_cm]
+    # Decimal compara com 0 direto (sem float() nem lista/gerador)
+    weight, length, width, height = product.weight_kg, product.length_cm, product.width_cm, product.height_cm
+    has_dimensions = (
+        weight is not None and weight > 0
+        and length is not None and length > 0
+        and width is not None and width > 0
+        and height is not None and height > 0
     )
 
     completeness_items = [
@@ -176,7 +308,7 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
     total = len(completeness_items)
     complete = sum(1 for i in completeness_items if i.is_complete)
     missing = [i.label for i in completeness_items if not i.is_complete]
-    completeness = Completeness(
+    completeness = Completeness.model_construct(
         percent=int(round((complete / total) * 100)),
         items=completeness_items,
         missing=missing,
@@ -203,45 +335,22 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
 
     scenarios = [
         _scenario_calc(
-            kind="base",
-            name="Base",
-            quantity=base_qty,
-            exchange_rate=base_exchange,
-            target_sale_price_brl=base_target_price,
-            fob_unit_usd=fob_unit,
-            freight_total_usd=base_freight_total,
-            insurance_total_usd=base_ins_total,
-            config=config,
-            sales_per_day=sales_per_day,
-        ),
-        _scenario_calc(
-            kind="conservative",
-            name="Conservador",
-            quantity=max(50, int(base_qty * 0.6)),
-            exchange_rate=base_exchange * 1.05,  # câmbio pior
-            target_sale_price_brl=base_target_price * 0.95,  # preço menor
-            fob_unit_usd=fob_unit * 1.03,  # FOB pior
-            freight_total_usd=base_freight_total * 1.15,
-            insurance_total_usd=base_ins_total * 1.1,
+            kind=kind,
+            name=name,
+            quantity=max(min_qty, int(base_qty * qty_f)),
+            exchange_rate=base_exchange * exchange_f,
+            target_sale_price_brl=base_target_price * price_f,
+            fob_unit_usd=max(0.0, fob_unit * fob_f),
+            freight_total_usd=base_freight_total * freight_f,
+            insurance_total_usd=base_ins_total * insurance_f,
             config=config,
             sales_per_day=sales_per_day,
-        ),
-        _scenario_calc(
-            kind="optimistic",
-            name="Otimista",
-            quantity=int(base_qty * 1.3),
-            exchange_rate=base_exchange * 0.97,
-            target_sale_price_brl=base_target_price * 1.03,
-            fob_unit_usd=max(0.0, fob_unit * 0.98),
-            freight_total_usd=base_freight_total * 0.95,
-            insurance_total_usd=base_ins_total * 0.95,
-            config=config,
-            sales_per_day=sales_per_day,
-        ),
+        )
+        for kind, name, qty_f, min_qty, exchange_f, price_f, fob_f, freight_f, insurance_f in _SCENARIO_SPECS
     ]
 
-    conservative = next(s for s in scenarios if s.kind == "conservative")
-    base = next(s for s in scenarios if s.kind == "base")
+    # Lista montada na ordem fixa base, conservador, otimista
+    base, conservative, _optimistic = scenarios
 
     blockers: list[Blocker] = []
     notes: list[str] = []
@@ -256,8 +365,13 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
             )
         )
 
-    if has_ncm and product.ncm is not None:
-        if getattr(product.ncm, "antidumping", False):
+    ncm = product.ncm
+    if has_ncm and ncm is not None:
+        # Flags lidas de uma vez (colunas do Ncm, já carregado no joinedload)
+        antidumping, requires_li, anvisa, anatel, inmetro = (
+            ncm.antidumping, ncm.requires_li, ncm.anvisa, ncm.anatel, ncm.inmetro
+        )
+        if antidumping:
             blockers.append(
                 Blocker(
                     key="antidumping",
@@ -265,13 +379,13 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
                     reason="NCM indica possível antidumping. Requer validação antes de importar.",
                 )
             )
-        if getattr(product.ncm, "requires_li", False):
+        if requires_li:
             notes.append("NCM indica possível necessidade de LI. Inclua tempo/custo de compliance no cenário real.")
-        if getattr(product.ncm, "anvisa", False):
+        if anvisa:
             notes.append("NCM sinaliza possível controle Anvisa. Avaliar exigências e viabilidade.")
-        if getattr(product.ncm, "anatel", False):
+        if anatel:
             notes.append("NCM sinaliza possível controle Anatel. Avaliar homologação.")
-        if getattr(product.ncm, "inmetro", False):
+        if inmetro:
             notes.append("NCM sinaliza possível controle Inmetro. Avaliar certificação.")
 
     # Pilares
@@ -318,11 +432,12 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
     ue_status = "unknown"
     ue_summary = "Sem cenário conservador confiável (preço alvo e custos)."
     ue_next = "Definir preço alvo e rodar cenários com quantidade realista."
+    # Cenários guardam precisão total (o arredondamento é só na serialização)
     ue_metrics = [
-        Metric(key="margin_conservative", label="Margem (conservador)", value=conservative.estimated_margin_pct, unit="%"),
-        Metric(key="unit_cost_conservative", label="Custo unit. (conservador)", value=conservative.unit_cost_brl, unit="BRL"),
-        Metric(key="unit_cost_base", label="Custo unit. (base)", value=base.unit_cost_brl, unit="BRL"),
-        Metric(key="customs_value_base", label="Valor aduaneiro (base)", value=base.customs_value_usd, unit="USD"),
+        Metric(key="margin_conservative", label="Margem (conservador)", value=round(conservative.estimated_margin_pct, 2), unit="%"),
+        Metric(key="unit_cost_conservative", label="Custo unit. (conservador)", value=round(conservative.unit_cost_brl, 2), unit="BRL"),
+        Metric(key="unit_cost_base", label="Custo unit. (base)", value=round(base.unit_cost_brl, 2), unit="BRL"),
+        Metric(key="customs_value_base", label="Valor aduaneiro (base)", value=round(base.customs_value_usd, 2), unit="USD"),
     ]
     if conservative.target_sale_price_brl > 0 and fob_unit > 0:
         if conservative.approved:
@@ -413,10 +528,9 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
         decision = "reject"
         decision_reason = conservative.reason or "Reprovado no cenário conservador."
 
-    last_decision = _latest_decision(db, product_id)
     latest_decision_out = ProductDecisionOut.model_validate(last_decision) if last_decision else None
 
-    header = EvaluationHeader(
+    header = EvaluationHeader.model_construct(
         product_id=product.id,
         product_name=product.name,
         category=product.category,
@@ -435,22 +549,7 @@ def compute_product_evaluation(db: Session, product_id: int) -> ProductEvaluatio
     if not has_market_data:
         notes.append("Sem dados de mercado, a avaliação de demanda/competição fica inconclusiva.")
 
-    score_out: Optional[ScoreSummary] = None
-    try:
-        score_dict, _notes, reasons = compute_product_score_v2(db, product_id)
-        score_out = ScoreSummary(
-            total_score=score_dict["total_score"],
-            classification=score_dict["classification"],
-            demand_score=score_dict["demand_score"],
-            competition_score=score_dict["competition_score"],
-            margin_score=score_dict["margin_score"],
-            risk_score=score_dict["risk_score"],
-            reasons=reasons,
-        )
-    except Exception:
-        score_out = None
-
-    return ProductEvaluationResponse(
+    return ProductEvaluationResponse.model_construct(
         header=header,
         completeness=completeness,
         decision=decision,  # type: ignore[arg-type]
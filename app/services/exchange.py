@@ -1,14 +1,47 @@
 from __future__ import annotations
 
-from decimal import Decimal
+import time
+from typing import Optional, Tuple
+
 import httpx
 
 USD_BRL_URL = "https://economia.awesomeapi.com.br/json/last/USD-BRL"
 
-async def fetch_usd_brl_rate() -> Decimal:
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(USD_BRL_URL)
-        r.raise_for_status()
-        data = r.json()
-        bid = data["USDBRL"]["bid"]  # string tipo "5.2345"
-        return Decimal(bid)
+# Cotação não muda a cada requisição: reaproveita por alguns minutos
+RATE_TTL_SECONDS = 300
+
+# Cliente único (pool de conexões + TLS reaproveitados); criado no primeiro uso
+_client: Optional[httpx.AsyncClient] = None
+# (cotação, expira_em em time.monotonic())
+_cached_rate: Optional[Tuple[float, float]] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10)
+    return _client
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente compartilhado (chamar no shutdown da aplicação)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_usd_brl_rate() -> float:
+    """Cotação USD/BRL (bid) em float: quem chama já faz a conta em float."""
+    global _cached_rate
+    now = time.monotonic()
+    if _cached_rate is not None and _cached_rate[1] > now:
+        return _cached_rate[0]
+
+    r = await _get_client().get(USD_BRL_URL)
+    r.raise_for_status()
+    data = r.json()
+    bid = data["USDBRL"]["bid"]  # string tipo "5.2345"
+    rate = float(bid)
+    _cached_rate = (rate, now + RATE_TTL_SECONDS)
+    return rate
@@ -1,14 +1,56 @@
 # app/services/scoring.py
 
+from bisect import bisect_right
+from collections import OrderedDict
 from decimal import Decimal
-from typing import Optional, Tuple
+from functools import lru_cache
+from threading import Lock
+from typing import Final, Optional, Tuple
 
+from sqlalchemy import Float, and_, case, cast, func, select
 from sqlalchemy.orm import Session
 
 from app.models.product import Product
 from app.models.product_market_data import ProductMarketData
 from app.models.import_simulation import ImportSimulation
 
+# Configuração do score em tuplas de módulo: compartilhada por
+# _compute_product_score e ranking_score_subquery, sem recriar nada a cada chamada.
+
+# Faixas de normalização (mínimo, máximo)
+_SALES_PER_DAY_RANGE: Final[tuple[float, float]] = (0, 150)
+_SALES_PER_MONTH_RANGE: Final[tuple[float, float]] = (0, 4000)
+_VISITS_RANGE: Final[tuple[float, float]] = (0, 10000)
+_FULL_RATIO_RANGE: Final[tuple[float, float]] = (0, 80)
+_COMPETITOR_COUNT_RANGE: Final[tuple[float, float]] = (0, 30)
+_RANKING_POSITION_RANGE: Final[tuple[float, float]] = (1, 50000)
+_MARGIN_PCT_RANGE: Final[tuple[float, float]] = (10, 60)
+
+# Pesos: demanda (vendas/dia, vendas/mês, visitas),
+# concorrência (FULL, concorrentes, ranking) e total (demanda, concorrência, margem, risco)
+_DEMAND_WEIGHTS: Final[tuple[float, float, float]] = (0.6, 0.3, 0.1)
+_COMPETITION_WEIGHTS: Final[tuple[float, float, float]] = (0.4, 0.4, 0.2)
+_TOTAL_WEIGHTS: Final[tuple[float, float, float, float]] = (0.40, 0.25, 0.25, 0.10)
+
+# Risco: (peso mínimo em kg, penalidade), do mais pesado para o mais leve
+_WEIGHT_PENALTIES: Final[tuple[tuple[float, float], ...]] = ((5, 30), (2, 15))
+_FRAGILE_PENALTY: Final[float] = 15
+_BRAND_PENALTY: Final[float] = 40
+
+# Classificação: limites inferiores em ordem crescente e o rótulo de cada faixa
+# (bisect_right(_LABEL_BOUNDS, score) é o índice em _LABELS)
+_LABEL_BOUNDS: Final[tuple[float, ...]] = (40, 60, 80)
+_LABELS: Final[tuple[str, ...]] = ("descartar", "arriscado", "bom", "campeao")
+
+
+# Primeiro bullet de reasons por classificação ({total} = score 0–100)
+_REASON_TEMPLATES: Final[dict[str, str]] = {
+    "campeao": "Campeão ({total}/100): candidato forte para priorizar agora.",
+    "bom": "Bom ({total}/100): vale avaliação completa antes de descartar.",
+    "arriscado": "Arriscado ({total}/100): só avance se o cenário conservador fechar bem.",
+    "descartar": "Fraco ({total}/100): só avance se houver tese/estratégia específica.",
+}
+
 
 def _normalize(value: Optional[Decimal | float | int], min_val: float, max_val: float) -> float:
     if value is None:
@@ -25,19 +67,13 @@ def _get_latest_simulation(db: Session, product_id: int) -> Optional[ImportSimul
     return (
         db.query(ImportSimulation)
         .filter(ImportSimulation.product_id == product_id)
-        .order_by(ImportSimulation.created_at.desc())
+        .order_by(ImportSimulation.created_at.desc(), ImportSimulation.id.desc())
         .first()
     )
 
 
 def _score_to_label(total_score: float) -> str:
-    if total_score >= 80:
-        return "campeao"
-    if total_score >= 60:
-        return "bom"
-    if total_score >= 40:
-        return "arriscado"
-    return "descartar"
+    return _LABELS[bisect_right(_LABEL_BOUNDS, total_score)]
 
 
 def _make_reasons(
@@ -55,14 +91,8 @@ def _make_reasons(
 
     # 1) classificação + score
     if isinstance(total, int) and isinstance(classification, str):
-        if classification == "campeao":
-            reasons.append(f"Campeão ({total}/100): candidato forte para priorizar agora.")
-        elif classification == "bom":
-            reasons.append(f"Bom ({total}/100): vale avaliação completa antes de descartar.")
-        elif classification == "arriscado":
-            reasons.append(f"Arriscado ({total}/100): só avance se o cenário conservador fechar bem.")
-        else:
-            reasons.append(f"Fraco ({total}/100): só avance se houver tese/estratégia específica.")
+        template = _REASON_TEMPLATES.get(classification, _REASON_TEMPLATES["descartar"])
+        reasons.append(template.format_map({"total": total}))
 
     # 2) demanda
     if market and market.sales_per_day is not None:
@@ -95,18 +125,17 @@ def _make_reasons(
 
     # 5) risco (só se houver sinais)
     risk_flags: list[str] = []
-    try:
-        weight_kg = float(product.weight_kg or 0)
-        if weight_kg > 5:
-            risk_flags.append(">5kg (ruim p/ simplificada)")
-        elif weight_kg > 2:
-            risk_flags.append(">2kg (frete pesa)")
-    except Exception:
-        pass
-
-    if getattr(product, "fragile", False):
+    # Colunas do próprio Product: acesso direto; NULL nos booleanos
+    # cai no mesmo caminho de False
+    weight_kg = float(product.weight_kg or 0)
+    if weight_kg > 5:
+        risk_flags.append(">5kg (ruim p/ simplificada)")
+    elif weight_kg > 2:
+        risk_flags.append(">2kg (frete pesa)")
+
+    if product.fragile:
         risk_flags.append("frágil (risco logístico)")
-    if getattr(product, "is_famous_brand", False) and not getattr(product, "has_brand_authorization", False):
+    if product.is_famous_brand and not product.has_brand_authorization:
         risk_flags.append("marca famosa sem autorização (PI)")
 
     if risk_flags:
@@ -116,15 +145,25 @@ def _make_reasons(
     return reasons[:5]
 
 
-def compute_product_score(db: Session, product_id: int) -> Tuple[dict, list[str]]:
+def latest_id_subquery(model):
     """
-    Mantido para compatibilidade.
-    Retorna:
-      - dict com sub-scores e total
-      - lista de notas / motivos em texto
+    id da linha mais recente de `model` (por created_at) para o Product da
+    query externa: subquery correlacionada, para usar no ON de um outer join.
+    Servida pelo índice (product_id, created_at), sem numerar a tabela inteira.
     """
-    notes: list[str] = []
+    return (
+        select(model.id)
+        .where(model.product_id == Product.id)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(1)
+        .correlate(Product)
+        .scalar_subquery()
+    )
 
+
+def _load_score_inputs(
+    db: Session, product_id: int
+) -> Tuple[Product, Optional[ProductMarketData], Optional[ImportSimulation]]:
     product: Optional[Product] = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise ValueError("Produto não encontrado.")
@@ -135,92 +174,225 @@ def compute_product_score(db: Session, product_id: int) -> Tuple[dict, list[str]
         .first()
     )
     simulation: Optional[ImportSimulation] = _get_latest_simulation(db, product_id)
+    return product, market, simulation
+
+
+def compute_product_score(
+    db: Session, product_id: int, *, include_notes: bool = True
+) -> Tuple[dict, list[str]]:
+    """
+    Mantido para compatibilidade.
+    Retorna:
+      - dict com sub-scores e total
+      - lista de notas / motivos em texto (vazia com include_notes=False)
+    """
+    return compute_product_score_from_objs(
+        *_load_score_inputs(db, product_id), include_notes=include_notes
+    )
+
+
+# Cache em memória dos scores (e das reasons do v2), chaveado pela "versão" dos dados de entrada.
+# Produto muda -> updated_at muda; mercado é atualizado no lugar -> usamos os
+# próprios valores; simulações não são editadas -> basta o id.
+_SCORE_CACHE_MAXSIZE = 4096
+_score_cache: "OrderedDict[tuple, Tuple[dict, list[str]] | list[str]]" = OrderedDict()
+_score_cache_lock = Lock()
+
+
+def _score_cache_key(
+    product: Product,
+    market: Optional[ProductMarketData],
+    simulation: Optional[ImportSimulation],
+) -> tuple:
+    market_version = None
+    if market is not None:
+        market_version = (
+            market.sales_per_day,
+            market.sales_per_month,
+            market.visits,
+            market.full_ratio,
+            market.competitor_count,
+            market.ranking_position,
+            market.price_average_brl,
+        )
+    return (
+        product.id,
+        product.updated_at,
+        market_version,
+        simulation.id if simulation is not None else None,
+    )
+
+
+def compute_product_score_from_objs(
+    product: Product,
+    market: Optional[ProductMarketData],
+    simulation: Optional[ImportSimulation],
+    *,
+    include_notes: bool = True,
+) -> Tuple[dict, list[str]]:
+    """
+    Mesma regra de compute_product_score, mas sem acessar o banco:
+    recebe produto, dados de mercado e última simulação já carregados.
+    O resultado vem de um cache compartilhado; não altere o dict/lista retornados.
+    """
+    key = _score_cache_key(product, market, simulation)
+    return _cached_score(key, product, market, simulation, include_notes=include_notes)
+
+
+def _cache_get(key: tuple):
+    with _score_cache_lock:
+        cached = _score_cache.get(key)
+        if cached is not None:
+            _score_cache.move_to_end(key)
+        return cached
+
+
+def _cache_put(key: tuple, value) -> None:
+    with _score_cache_lock:
+        _score_cache[key] = value
+        if len(_score_cache) > _SCORE_CACHE_MAXSIZE:
+            _score_cache.popitem(last=False)
+
+
+def _cached_score(
+    key: tuple,
+    product: Product,
+    market: Optional[ProductMarketData],
+    simulation: Optional[ImportSimulation],
+    *,
+    include_notes: bool,
+) -> Tuple[dict, list[str]]:
+    # Com e sem notas são entradas separadas: quem não pede notas não paga por elas
+    key = key + (include_notes,)
+    cached = _cache_get(key)
+    if cached is None:
+        cached = _compute_product_score(product, market, simulation, include_notes=include_notes)
+        _cache_put(key, cached)
+    return cached
+
+
+def invalidate_product_score(product_id: int) -> None:
+    """
+    Descarta do cache os scores de um produto (chamar nas escritas de
+    produto/mercado/simulação). As chaves já mudam com os dados; isto só
+    libera logo as entradas que ficaram velhas.
+    """
+    with _score_cache_lock:
+        for key in [k for k in _score_cache if k[0] == product_id]:
+            del _score_cache[key]
+
+
+def _compute_product_score(
+    product: Product,
+    market: Optional[ProductMarketData],
+    simulation: Optional[ImportSimulation],
+    *,
+    include_notes: bool = True,
+) -> Tuple[dict, list[str]]:
+    notes: list[str] = []
 
     # 1) DEMANDA
     sales_per_day = market.sales_per_day if market else None
     sales_per_month = market.sales_per_month if market else None
     visits = market.visits if market else None
 
-    sales_day_score = _normalize(sales_per_day or 0, 0, 150) * 100
-    sales_month_score = _normalize(sales_per_month or 0, 0, 4000) * 100
-    visits_score = _normalize(visits or 0, 0, 10000) * 100
+    sales_day_score = _normalize(sales_per_day or 0, *_SALES_PER_DAY_RANGE) * 100
+    sales_month_score = _normalize(sales_per_month or 0, *_SALES_PER_MONTH_RANGE) * 100
+    visits_score = _normalize(visits or 0, *_VISITS_RANGE) * 100
 
-    demand_score = (0.6 * sales_day_score + 0.3 * sales_month_score + 0.1 * visits_score)
+    w_day, w_month, w_visits = _DEMAND_WEIGHTS
+    demand_score = (w_day * sales_day_score + w_month * sales_month_score + w_visits * visits_score)
 
-    if sales_per_day:
-        notes.append(f"Demanda: ~{sales_per_day} vendas/dia.")
-    if not market:
-        notes.append("Sem dados de mercado cadastrados; demanda considerada neutra/baixa.")
+    if include_notes:
+        if sales_per_day:
+            notes.append(f"Demanda: ~{sales_per_day} vendas/dia.")
+        if not market:
+            notes.append("Sem dados de mercado cadastrados; demanda considerada neutra/baixa.")
 
     # 2) CONCORRÊNCIA
     full_ratio = market.full_ratio if market else None
     competitor_count = market.competitor_count if market else None
     ranking_position = market.ranking_position if market else None
 
-    full_penalty = _normalize(full_ratio or 0, 0, 80) * 100
-    competitors_penalty = _normalize(competitor_count or 0, 0, 30) * 100
-    ranking_penalty = _normalize(ranking_position or 50000, 1, 50000) * 100
+    full_penalty = _normalize(full_ratio or 0, *_FULL_RATIO_RANGE) * 100
+    competitors_penalty = _normalize(competitor_count or 0, *_COMPETITOR_COUNT_RANGE) * 100
+    ranking_penalty = _normalize(
+        ranking_position or _RANKING_POSITION_RANGE[1], *_RANKING_POSITION_RANGE
+    ) * 100
 
+    w_full, w_competitors, w_ranking = _COMPETITION_WEIGHTS
     competition_score = max(
         0.0,
-        100.0 - (0.4 * full_penalty + 0.4 * competitors_penalty + 0.2 * ranking_penalty),
+        100.0 - (w_full * full_penalty + w_competitors * competitors_penalty + w_ranking * ranking_penalty),
     )
 
-    if full_ratio is not None:
-        notes.append(f"Concorrência FULL: ~{full_ratio}% dos principais anúncios.")
-    if competitor_count is not None:
-        notes.append(f"Concorrentes relevantes: ~{competitor_count}.")
-    if ranking_position is not None:
-        notes.append(f"Ranking aproximado do líder: {ranking_position}.")
+    if include_notes:
+        if full_ratio is not None:
+            notes.append(f"Concorrência FULL: ~{full_ratio}% dos principais anúncios.")
+        if competitor_count is not None:
+            notes.append(f"Concorrentes relevantes: ~{competitor_count}.")
+        if ranking_position is not None:
+            notes.append(f"Ranking aproximado do líder: {ranking_position}.")
 
     # 3) MARGEM
     margin_pct = simulation.estimated_margin_pct if simulation else None
-    margin_score = _normalize(margin_pct or 0, 10, 60) * 100
+    margin_score = _normalize(margin_pct or 0, *_MARGIN_PCT_RANGE) * 100
 
-    if margin_pct is not None:
-        notes.append(f"Margem estimada na última simulação: {round(float(margin_pct), 1)}%.")
-    else:
-        notes.append("Sem simulação de importação cadastrada; margem considerada baixa.")
+    if include_notes:
+        if margin_pct is not None:
+            notes.append(f"Margem estimada na última simulação: {round(float(margin_pct), 1)}%.")
+        else:
+            notes.append("Sem simulação de importação cadastrada; margem considerada baixa.")
 
     # 4) RISCO
-    risk_score = 100.0
-
     weight_kg = float(product.weight_kg or 0)
-    if weight_kg > 5:
-        risk_score -= 30
-        notes.append("Produto pesado (>5kg) — ruim para Importação Simplificada.")
-    elif weight_kg > 2:
-        risk_score -= 15
-        notes.append("Produto moderadamente pesado (>2kg).")
-
-    if product.fragile:
-        risk_score -= 15
-        notes.append("Produto frágil — risco logístico maior.")
+    (heavy_kg, heavy_penalty), (medium_kg, medium_penalty) = _WEIGHT_PENALTIES
+    heavy = weight_kg > heavy_kg
+    medium = medium_kg < weight_kg <= heavy_kg
+    fragile = bool(product.fragile)
+    brand_risk = bool(product.is_famous_brand and not product.has_brand_authorization)
+
+    # Sem desvios: cada bool vale 0/1 na conta; as notas vêm à parte
+    risk_score = (
+        100.0
+        - heavy_penalty * heavy
+        - medium_penalty * medium
+        - _FRAGILE_PENALTY * fragile
+        - _BRAND_PENALTY * brand_risk
+    )
 
-    if product.is_famous_brand and not product.has_brand_authorization:
-        risk_score -= 40
-        notes.append("Marca famosa sem autorização — alto risco de PI / apreensão.")
+    if include_notes:
+        if heavy:
+            notes.append("Produto pesado (>5kg) — ruim para Importação Simplificada.")
+        elif medium:
+            notes.append("Produto moderadamente pesado (>2kg).")
+        if fragile:
+            notes.append("Produto frágil — risco logístico maior.")
+        if brand_risk:
+            notes.append("Marca famosa sem autorização — alto risco de PI / apreensão.")
 
     risk_score = max(0.0, min(100.0, risk_score))
 
     # 5) SCORE FINAL
+    w_demand, w_competition, w_margin, w_risk = _TOTAL_WEIGHTS
     total_score = (
-        0.40 * demand_score +
-        0.25 * competition_score +
-        0.25 * margin_score +
-        0.10 * risk_score
+        w_demand * demand_score +
+        w_competition * competition_score +
+        w_margin * margin_score +
+        w_risk * risk_score
     )
 
     classification = _score_to_label(total_score)
 
-    if classification == "campeao":
-        notes.append("Produto classificado como CAMPEÃO (score >= 80).")
-    elif classification == "bom":
-        notes.append("Produto VIÁVEL para teste (score entre 60 e 79).")
-    elif classification == "arriscado":
-        notes.append("Produto ARRISCADO (score entre 40 e 59).")
-    else:
-        notes.append("Produto RECOMENDADO PARA DESCARTE (score < 40).")
+    if include_notes:
+        if classification == "campeao":
+            notes.append("Produto classificado como CAMPEÃO (score >= 80).")
+        elif classification == "bom":
+            notes.append("Produto VIÁVEL para teste (score entre 60 e 79).")
+        elif classification == "arriscado":
+            notes.append("Produto ARRISCADO (score entre 40 e 59).")
+        else:
+            notes.append("Produto RECOMENDADO PARA DESCARTE (score < 40).")
 
     result = {
         "demand_score": int(round(demand_score)),
@@ -242,28 +414,203 @@ def compute_product_score(db: Session, product_id: int) -> Tuple[dict, list[str]
     return result, notes
 
 
-def compute_product_score_v2(db: Session, product_id: int) -> Tuple[dict, list[str], list[str]]:
+def _is_odd_sql(n):
+    """1.0 se o inteiro `n` (em float) for ímpar, senão 0.0 (vale para negativos)."""
+    return n - 2.0 * func.floor(n / 2.0)
+
+
+def _round_half_even_sql(value, error=None):
     """
-    V2: retorna também "reasons" (bullets curtos) para UI.
+    round() do Python (empate vai para o par) de `value` + `error`, em que
+    `error` é o resíduo exato já conhecido de `value` (ou nada).
+    value - floor(value) - 0.5 é exato, então o sinal decide sem erro.
+    """
+    n = func.floor(value)
+    diff = (value - n).self_group() - 0.5
+    if error is not None:
+        diff = diff.self_group() + error
+    return n + case((diff > 0.0, 1.0), (diff < 0.0, 0.0), else_=_is_odd_sql(n))
 
-    Retorna:
-      - dict com sub-scores e total
-      - notes (texto mais longo, debug)
-      - reasons (bullets curtos e consistentes)
+
+def _numeric_sql(value, scale: int):
     """
-    result, notes = compute_product_score(db, product_id)
+    float(coluna Numeric) como o Python a recebe. No SQLite o REAL gravado não
+    vem arredondado e o SQLAlchemy devolve Decimal("%.{scale}f" % valor);
+    ROUND(x, scale) do SQLite não serve (ROUND(2.675, 2) = 2.68, o Python dá
+    2.67). Então: p = v * 10^scale, o erro exato desse produto (Dekker, com
+    v partido em duas metades de 26 bits) e o arredondamento de p + erro.
+    Onde a coluna já é NUMERIC de verdade, o resultado é o próprio valor.
+    """
+    factor = float(10**scale)
+    v = cast(value, Float)
+    p = (v * factor).self_group()
+    t = (v * 134217729.0).self_group()  # 2**27 + 1
+    hi = (t - (t - v).self_group()).self_group()
+    lo = (v - hi).self_group()
+    error = (hi * factor - p).self_group() + lo * factor
+    return _round_half_even_sql(p, error.self_group()) / factor
+
+
+def _normalize_sql(value, min_val: float, max_val: float):
+    """Versão SQL de _normalize (value já sem NULL)."""
+    v = cast(value, Float)
+    return case(
+        (v <= float(min_val), 0.0),
+        (v >= float(max_val), 1.0),
+        else_=(v - float(min_val)).self_group() / float(max_val - min_val),
+    )
 
-    product: Optional[Product] = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        # compute_product_score já teria falhado, mas mantemos segurança
-        return result, notes, []
 
-    market: Optional[ProductMarketData] = (
-        db.query(ProductMarketData)
-        .filter(ProductMarketData.product_id == product_id)
-        .first()
+def _score_sql(value, value_range: tuple[float, float]):
+    """_normalize(...) * 100 agrupado: o SQL não pode reassociar w * (x * 100)."""
+    return (_normalize_sql(value, *value_range) * 100.0).self_group()
+
+
+def _score_inputs_subquery():
+    """
+    Entradas do score como o Python as recebe (Numeric já arredondado na
+    escala da coluna, bools como 0/1), uma linha por produto × simulação;
+    rn = 1 é a última. O ROW_NUMBER também impede o SQLite de achatar a
+    subquery: cada valor é calculado uma vez por linha, não a cada uso.
+    """
+    m = ProductMarketData
+    s = ImportSimulation
+    ranked = select(
+        Product.id.label("product_id"),
+        s.id.label("simulation_id"),
+        func.coalesce(m.sales_per_day, 0).label("sales_per_day"),
+        func.coalesce(m.sales_per_month, 0).label("sales_per_month"),
+        func.coalesce(m.visits, 0).label("visits"),
+        _numeric_sql(func.coalesce(m.full_ratio, 0), m.full_ratio.type.scale).label("full_ratio"),
+        func.coalesce(m.competitor_count, 0).label("competitor_count"),
+        # `ranking_position or 50000` no Python: 0 e NULL viram o máximo da faixa
+        func.coalesce(func.nullif(m.ranking_position, 0), _RANKING_POSITION_RANGE[1]).label("ranking_position"),
+        _numeric_sql(
+            func.coalesce(s.estimated_margin_pct, 0), s.estimated_margin_pct.type.scale
+        ).label("margin_pct"),
+        _numeric_sql(func.coalesce(Product.weight_kg, 0), Product.weight_kg.type.scale).label("weight_kg"),
+        case((Product.fragile.is_(True), 1.0), else_=0.0).label("fragile"),
+        case(
+            (
+                and_(
+                    Product.is_famous_brand.is_(True),
+                    func.coalesce(Product.has_brand_authorization, False).is_(False),
+                ),
+                1.0,
+            ),
+            else_=0.0,
+        ).label("brand_risk"),
+        func.row_number()
+        .over(partition_by=Product.id, order_by=(s.created_at.desc(), s.id.desc()))
+        .label("rn"),
+    ).select_from(Product).outerjoin(m, m.product_id == Product.id).outerjoin(s, s.product_id == Product.id)
+    return ranked.subquery("score_inputs")
+
+
+@lru_cache(maxsize=1)
+def ranking_score_subquery():
+    """
+    Subquery (product_id, simulation_id, total_score) com o total_score
+    inteiro de cada produto e a sua última simulação, igual ao de
+    compute_product_score_from_objs: mesmas constantes, mesma ordem das
+    operações em float e round() com empate para o par. Pronta para
+    ORDER BY total_score DESC, Product.id + LIMIT. Não depende de nada da
+    requisição, então é montada uma vez só (o construct é imutável).
+    """
+    i = _score_inputs_subquery().c
+    w_day, w_month, w_visits = _DEMAND_WEIGHTS
+    w_full, w_competitors, w_ranking = _COMPETITION_WEIGHTS
+    w_demand, w_competition, w_margin, w_risk = _TOTAL_WEIGHTS
+
+    demand_score = (
+        w_day * _score_sql(i.sales_per_day, _SALES_PER_DAY_RANGE)
+        + w_month * _score_sql(i.sales_per_month, _SALES_PER_MONTH_RANGE)
+        + w_visits * _score_sql(i.visits, _VISITS_RANGE)
     )
-    simulation: Optional[ImportSimulation] = _get_latest_simulation(db, product_id)
 
-    reasons = _make_reasons(product=product, market=market, simulation=simulation, result=result)
+    competition_penalty = (
+        w_full * _score_sql(i.full_ratio, _FULL_RATIO_RANGE)
+        + w_competitors * _score_sql(i.competitor_count, _COMPETITOR_COUNT_RANGE)
+        + w_ranking * _score_sql(i.ranking_position, _RANKING_POSITION_RANGE)
+    )
+    competition_score = 100.0 - competition_penalty.self_group()
+    competition_score = case((competition_score < 0.0, 0.0), else_=competition_score)
+
+    margin_score = _score_sql(i.margin_pct, _MARGIN_PCT_RANGE)
+
+    (heavy_kg, heavy_penalty), (medium_kg, medium_penalty) = _WEIGHT_PENALTIES
+    heavy = case((i.weight_kg > heavy_kg, 1.0), else_=0.0)
+    medium = case((and_(i.weight_kg > medium_kg, i.weight_kg <= heavy_kg), 1.0), else_=0.0)
+    risk_score = (
+        100.0
+        - heavy_penalty * heavy
+        - medium_penalty * medium
+        - _FRAGILE_PENALTY * i.fragile
+        - _BRAND_PENALTY * i.brand_risk
+    )
+    risk_score = case((risk_score < 0.0, 0.0), (risk_score > 100.0, 100.0), else_=risk_score)
+
+    total_score = (
+        w_demand * demand_score.self_group() +
+        w_competition * competition_score +
+        w_margin * margin_score +
+        w_risk * risk_score
+    )
+    return (
+        select(
+            i.product_id,
+            i.simulation_id,
+            _round_half_even_sql(total_score).label("total_score"),
+        )
+        .where(i.rn == 1)
+        .subquery("ranking_scores")
+    )
+
+
+def compute_product_score_v2_from_objs(
+    product: Product,
+    market: Optional[ProductMarketData],
+    simulation: Optional[ImportSimulation],
+    *,
+    include_notes: bool = True,
+    include_reasons: bool = True,
+) -> Tuple[dict, list[str], list[str]]:
+    """
+    Mesma regra de compute_product_score_v2, com os objetos já carregados.
+    Score e reasons vêm do mesmo cache (mesma chave de versão); não altere o retorno.
+    Sem include_notes/include_reasons a lista correspondente volta vazia.
+    """
+    key = _score_cache_key(product, market, simulation)
+    result, notes = _cached_score(key, product, market, simulation, include_notes=include_notes)
+    if not include_reasons:
+        return result, notes, []
+
+    reasons_key = key + ("reasons",)
+    reasons = _cache_get(reasons_key)
+    if reasons is None:
+        reasons = _make_reasons(product=product, market=market, simulation=simulation, result=result)
+        _cache_put(reasons_key, reasons)
     return result, notes, reasons
+
+
+def compute_product_score_v2(
+    db: Session,
+    product_id: int,
+    *,
+    include_notes: bool = True,
+    include_reasons: bool = True,
+) -> Tuple[dict, list[str], list[str]]:
+    """
+    V2: retorna também "reasons" (bullets curtos) para UI.
+
+    Retorna:
+      - dict com sub-scores e total
+      - notes (texto mais longo, debug; só com include_notes=True)
+      - reasons (bullets curtos e consistentes; só com include_reasons=True)
+    """
+    # Carrega produto/mercado/simulação uma vez só (antes eram duas)
+    return compute_product_score_v2_from_objs(
+        *_load_score_inputs(db, product_id),
+        include_notes=include_notes,
+        include_reasons=include_reasons,
+    )
@@ -0,0 +1,84 @@
+# app/services/simulation.py
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+# Limite da Importação Simplificada por operação (US$ 3.000 de valor aduaneiro)
+MAX_CUSTOMS_VALUE_USD = 3000.0
+
+# Margem mínima (ex.: 35%)
+MIN_MARGIN_PCT = 35
+
+
+@dataclass(frozen=True)
+class SimulationCalc:
+    fob_total_usd: float
+    freight_total_usd: float
+    insurance_total_usd: float
+    customs_value_usd: float
+    estimated_total_cost_usd: float
+    estimated_total_cost_brl: float
+    unit_cost_brl: float
+    estimated_margin_pct: float
+    approved: bool
+    reason: str
+
+
+def to_decimal(value: float, places: int) -> Decimal:
+    """Float -> Decimal com `places` casas (mesma formatação que o SQLite devolve)."""
+    return Decimal(f"{value:.{places}f}")
+
+
+def compute_simulation(
+    *,
+    quantity: int,
+    exchange_rate: float,
+    target_sale_price_brl: float,
+    fob_unit_usd: float,
+    freight_total_usd: float,
+    insurance_total_usd: float,
+) -> SimulationCalc:
+    """
+    Conta da simulação de importação em float.
+    Quem chama converte os Decimals do banco/payload uma única vez antes,
+    em vez de fazer toda a aritmética com Decimal.
+    """
+    # FOB total (produto * quantidade)
+    fob_total_usd = fob_unit_usd * quantity
+    customs_value_usd = fob_total_usd + freight_total_usd + insurance_total_usd
+
+    # Regra rápida: custo total ≈ custo aduaneiro * 2
+    estimated_total_cost_usd = customs_value_usd * 2
+    estimated_total_cost_brl = estimated_total_cost_usd * exchange_rate
+
+    unit_cost_brl = estimated_total_cost_brl / quantity
+
+    # Margem em %
+    estimated_margin_pct = (target_sale_price_brl - unit_cost_brl) / target_sale_price_brl * 100
+
+    # Regras de aprovação simples (você pode ajustar depois)
+    reasons = []
+    approved = True
+
+    if customs_value_usd > MAX_CUSTOMS_VALUE_USD:
+        approved = False
+        reasons.append("Excede o limite de US$ 3.000 de valor aduaneiro por remessa.")
+
+    if estimated_margin_pct < MIN_MARGIN_PCT:
+        approved = False
+        reasons.append(f"Margem abaixo de {MIN_MARGIN_PCT}%.")
+
+    return SimulationCalc(
+        fob_total_usd=fob_total_usd,
+        freight_total_usd=freight_total_usd,
+        insurance_total_usd=insurance_total_usd,
+        customs_value_usd=customs_value_usd,
+        estimated_total_cost_usd=estimated_total_cost_usd,
+        estimated_total_cost_brl=estimated_total_cost_brl,
+        unit_cost_brl=unit_cost_brl,
+        estimated_margin_pct=estimated_margin_pct,
+        approved=approved,
+        reason=" ".join(reasons) if reasons else "Aprovado nos critérios definidos.",
+    )
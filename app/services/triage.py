@@ -2,14 +2,15 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from itertools import groupby
+from typing import List, Optional, Tuple
 
 from app.models.product_decision import ProductDecision
 from app.schemas.decision import ProductDecisionOut
 
-from sqlalchemy import and_, func
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session, contains_eager
+from starlette.concurrency import run_in_threadpool
 
 from app.models.import_simulation import ImportSimulation
 from app.models.product import Product
@@ -20,44 +21,50 @@ from app.schemas.triage import (
     SimulationSummaryOut,
     TriageStatus,
 )
-from app.services.scoring import compute_product_score, compute_product_score_v2
+from app.services.scoring import compute_product_score_v2_from_objs, latest_id_subquery
 
 
-@dataclass(frozen=True)
-class _Flags:
-    has_fob: bool
-    has_freight: bool
-    has_market: bool
-    has_sim: bool
+# Flags de completude como bits de um int (índice das tabelas abaixo)
+_HAS_FOB = 1
+_HAS_FREIGHT = 2
+_HAS_MARKET = 4
+_HAS_SIM = 8
 
 
-def _status_and_action(flags: _Flags) -> Tuple[TriageStatus, str, int]:
+def _status_and_action(mask: int) -> Tuple[TriageStatus, str, int]:
     """Retorna (status, next_action, priority_rank). Menor priority_rank = avaliar antes."""
-    if not flags.has_fob or not flags.has_freight:
-        if not flags.has_fob:
-            return "needs_costs", "Preencher FOB (custo base do fornecedor)", 30
+    if not mask & _HAS_FOB:
+        return "needs_costs", "Preencher FOB (custo base do fornecedor)", 30
+    if not mask & _HAS_FREIGHT:
         return "needs_costs", "Preencher frete (estimativa para simulação)", 20
 
-    if not flags.has_market:
+    if not mask & _HAS_MARKET:
         return "needs_market", "Preencher dados de mercado (Avant Pro / ML)", 10
 
-    if not flags.has_sim:
+    if not mask & _HAS_SIM:
         return "needs_simulation", "Rodar simulação (cenários e margem)", 5
 
     return "ready", "Avaliar e decidir (aprovar / reprovar)", 0
 
 
-def _build_alerts(product: Product, flags: _Flags) -> List[str]:
-    alerts: List[str] = []
+_MISSING_ALERTS: Tuple[Tuple[int, str], ...] = (
+    (_HAS_FOB, "Sem FOB: custo base do fornecedor não informado."),
+    (_HAS_FREIGHT, "Sem frete: simulação tende a ficar imprecisa."),
+    (_HAS_MARKET, "Sem dados de mercado: demanda/concorrência não avaliadas."),
+    (_HAS_SIM, "Sem simulação: margem ainda não validada."),
+)
+
+# Pré-calculadas para as 16 combinações: no loop é só indexar pela máscara
+_STATUS_TABLE: Tuple[Tuple[TriageStatus, str, int], ...] = tuple(
+    _status_and_action(mask) for mask in range(16)
+)
+_MISSING_ALERTS_TABLE: Tuple[Tuple[str, ...], ...] = tuple(
+    tuple(msg for bit, msg in _MISSING_ALERTS if not mask & bit) for mask in range(16)
+)
+
 
-    if not flags.has_fob:
-        alerts.append("Sem FOB: custo base do fornecedor não informado.")
-    if not flags.has_freight:
-        alerts.append("Sem frete: simulação tende a ficar imprecisa.")
-    if not flags.has_market:
-        alerts.append("Sem dados de mercado: demanda/concorrência não avaliadas.")
-    if not flags.has_sim:
-        alerts.append("Sem simulação: margem ainda não validada.")
+def _build_alerts(product: Product, mask: int) -> List[str]:
+    alerts: List[str] = list(_MISSING_ALERTS_TABLE[mask])
 
     # riscos clássicos
     if product.is_famous_brand and not product.has_brand_authorization:
@@ -80,61 +87,51 @@ def _build_alerts(product: Product, flags: _Flags) -> List[str]:
     return alerts
 
 
-def _get_last_simulations(db: Session) -> Dict[int, ImportSimulation]:
-    """Map product_id -> última simulação (por created_at), evitando N+1."""
-    subq = (
-        db.query(
-            ImportSimulation.product_id.label("product_id"),
-            func.max(ImportSimulation.created_at).label("max_created"),
-        )
-        .group_by(ImportSimulation.product_id)
-        .subquery()
-    )
-
-    rows = (
-        db.query(ImportSimulation)
-        .join(
-            subq,
-            and_(
-                ImportSimulation.product_id == subq.c.product_id,
-                ImportSimulation.created_at == subq.c.max_created,
-            ),
-        )
-        .all()
-    )
+# Ordem da triagem calculada no banco: decisão mais recente, depois completude
+# (mesmos ranks de _status_and_action). Só o score fica para o Python.
+_DECISION_RANK_SQL = case(
+    (ProductDecision.id.is_(None), 0),
+    (ProductDecision.decision == "needs_data", 1),
+    (ProductDecision.decision == "approve_test", 2),
+    (ProductDecision.decision == "approve_import", 3),
+    (ProductDecision.decision == "reject", 9),
+    else_=5,
+).label("decision_rank")
 
-    return {r.product_id: r for r in rows}
+_PRIORITY_RANK_SQL = case(
+    (Product.fob_price_usd.is_(None), 30),
+    (Product.freight_usd.is_(None), 20),
+    (ProductMarketData.id.is_(None), 10),
+    (ImportSimulation.id.is_(None), 5),
+    else_=0,
+).label("priority_rank")
 
 
-def _get_market_map(db: Session) -> Dict[int, ProductMarketData]:
-    rows = db.query(ProductMarketData).all()
-    return {r.product_id: r for r in rows}
+def _to_float(value) -> Optional[float]:
+    # Colunas Numeric (Decimal) ou None; model_construct não converte sozinho
+    return None if value is None else float(value)
 
-def _get_latest_decisions(db: Session) -> Dict[int, ProductDecision]:
-    """Map product_id -> última decisão (por created_at), evitando N+1."""
-    subq = (
-        db.query(
-            ProductDecision.product_id.label("product_id"),
-            func.max(ProductDecision.created_at).label("max_created"),
-        )
-        .group_by(ProductDecision.product_id)
-        .subquery()
-    )
 
-    rows = (
-        db.query(ProductDecision)
-        .join(
-            subq,
-            and_(
-                ProductDecision.product_id == subq.c.product_id,
-                ProductDecision.created_at == subq.c.max_created,
-            ),
-        )
+def _load_triage_rows(db: Session, limit: int) -> list:
+    """
+    Um único SELECT: produto + mercado (1:1) + última simulação + última decisão,
+    mais (decision_rank, priority_rank) já na ordem final.
+    Cada "última" é um outer join cujo ON usa latest_id_subquery (em vez de
+    LATERAL, que o SQLite não tem), servido pelo índice (product_id, created_at).
+    O LIMIT continua valendo para os `limit` produtos mais recentes.
+    """
+    latest_ids = select(Product.id).order_by(Product.created_at.desc()).limit(limit)
+    return (
+        db.query(Product, ImportSimulation, ProductDecision, _DECISION_RANK_SQL, _PRIORITY_RANK_SQL)
+        .outerjoin(Product.market_data)
+        .options(contains_eager(Product.market_data))
+        .outerjoin(ImportSimulation, ImportSimulation.id == latest_id_subquery(ImportSimulation))
+        .outerjoin(ProductDecision, ProductDecision.id == latest_id_subquery(ProductDecision))
+        .filter(Product.id.in_(latest_ids))
+        .order_by(_DECISION_RANK_SQL, _PRIORITY_RANK_SQL, Product.created_at.desc())
         .all()
     )
 
-    return {r.product_id: r for r in rows}
-
 
 def build_products_triage(
     db: Session,
@@ -148,49 +145,69 @@ def build_products_triage(
     - include_score: calcula total_score/classificação (usa compute_product_score)
     - include_notes: inclui notas do score (texto), útil para debug/UX
     """
+    rows = _load_triage_rows(db, limit)
+    return _score_triage_rows(rows, include_score=include_score, include_notes=include_notes)
 
-    products: List[Product] = (
-        db.query(Product)
-        .options(selectinload(Product.market_data))
-        .order_by(Product.created_at.desc())
-        .limit(limit)
-        .all()
+
+async def build_products_triage_async(
+    db: Session,
+    *,
+    limit: int = 200,
+    include_score: bool = True,
+    include_notes: bool = False,
+) -> List[ProductTriageOut]:
+    """
+    Mesma triagem para endpoints async: a leitura (Session síncrona) e a parte
+    de CPU (score/montagem) rodam no threadpool, sem ocupar o event loop.
+    """
+    rows = await run_in_threadpool(_load_triage_rows, db, limit)
+    return await run_in_threadpool(
+        _score_triage_rows, rows, include_score=include_score, include_notes=include_notes
     )
 
-    last_sim_map = _get_last_simulations(db)
-    market_map = _get_market_map(db)
-    decision_map = _get_latest_decisions(db)
 
+def _score_triage_rows(
+    rows: list, *, include_score: bool, include_notes: bool
+) -> List[ProductTriageOut]:
+    """Só CPU: tudo que é lido aqui já veio carregado em _load_triage_rows."""
     out: List[ProductTriageOut] = []
 
-    for p in products:
+    for p, last_sim, last_decision, _decision_rank, _priority_rank in rows:
+        market: Optional[ProductMarketData] = p.market_data
         has_fob = p.fob_price_usd is not None
         has_freight = p.freight_usd is not None
-        has_market = p.id in market_map
-        has_sim = p.id in last_sim_map
-
-        flags = _Flags(
-            has_fob=has_fob,
-            has_freight=has_freight,
-            has_market=has_market,
-            has_sim=has_sim,
-        )
+        has_market = market is not None
+        has_sim = last_sim is not None
+
+        mask = has_fob | has_freight << 1 | has_market << 2 | has_sim << 3
 
-        status, next_action, priority_rank = _status_and_action(flags)
-        alerts = _build_alerts(p, flags)
+        status, next_action, priority_rank = _STATUS_TABLE[mask]
+        alerts = _build_alerts(p, mask)
 
-        last_sim = last_sim_map.get(p.id)
+        # Linhas do próprio banco: model_construct (sem validação), com os
+        # Numeric já convertidos para os float dos schemas
         last_sim_out: Optional[SimulationSummaryOut] = (
-            SimulationSummaryOut.model_validate(last_sim) if last_sim else None
+            SimulationSummaryOut.model_construct(
+                id=last_sim.id,
+                created_at=last_sim.created_at,
+                approved=last_sim.approved,
+                unit_cost_brl=float(last_sim.unit_cost_brl),
+                target_sale_price_brl=float(last_sim.target_sale_price_brl),
+                estimated_margin_pct=float(last_sim.estimated_margin_pct),
+            )
+            if last_sim
+            else None
         )
 
         score_out: Optional[ScoreSummaryOut] = None
         if include_score:
             try:
-                result, notes, reasons = compute_product_score_v2(db, p.id)
-                market = market_map.get(p.id)
+                # Objetos já carregados na query acima: nenhuma query por produto
+                result, notes, reasons = compute_product_score_v2_from_objs(
+                    p, market, last_sim, include_notes=include_notes, include_reasons=True
+                )
 
-                score_out = ScoreSummaryOut(
+                score_out = ScoreSummaryOut.model_construct(
                     total_score=result["total_score"],
                     classification=result["classification"],
                     demand_score=result["demand_score"],
@@ -201,29 +218,37 @@ def build_products_triage(
                     sales_per_month=result.get("sales_per_month"),
                     visits=result.get("visits"),
                     competitor_count=(market.competitor_count if market else None),
-                    full_ratio=(market.full_ratio if market else None),
-                    price_average_brl=result.get("price_average_brl"),
-                    estimated_margin_pct=result.get("estimated_margin_pct"),
+                    full_ratio=_to_float(market.full_ratio if market else None),
+                    price_average_brl=_to_float(result.get("price_average_brl")),
+                    estimated_margin_pct=_to_float(result.get("estimated_margin_pct")),
                     has_latest_simulation=result.get("has_latest_simulation", False),
                     reasons=reasons,
                     notes=(" ".join(notes) if include_notes else None),
                 )
             except Exception:
                 score_out = None
-        last_decision = decision_map.get(p.id)
         latest_decision_out: Optional[ProductDecisionOut] = (
-            ProductDecisionOut.model_validate(last_decision) if last_decision else None
+            ProductDecisionOut.model_construct(
+                id=last_decision.id,
+                product_id=last_decision.product_id,
+                decision=last_decision.decision,
+                reason=last_decision.reason,
+                decided_by=last_decision.decided_by,
+                created_at=last_decision.created_at,
+            )
+            if last_decision
+            else None
         )
 
         out.append(
-            ProductTriageOut(
+            ProductTriageOut.model_construct(
                 product_id=p.id,
                 product_name=p.name,
                 category=p.category,
                 created_at=p.created_at,
-                fob_price_usd=p.fob_price_usd,
-                freight_usd=p.freight_usd,
-                insurance_usd=p.insurance_usd,
+                fob_price_usd=_to_float(p.fob_price_usd),
+                freight_usd=_to_float(p.freight_usd),
+                insurance_usd=_to_float(p.insurance_usd),
                 has_fob=has_fob,
                 has_freight=has_freight,
                 has_market_data=has_market,
@@ -238,29 +263,17 @@ def build_products_triage(
             )
         )
 
-    # Ordenação estratégica: prioridade + score + mais recente
-    def _decision_rank(x: ProductTriageOut) -> int:
-        if x.latest_decision is None:
-            return 0
-        d = x.latest_decision.decision
-        if d == "needs_data":
-            return 1
-        if d == "approve_test":
-            return 2
-        if d == "approve_import":
-            return 3
-        if d == "reject":
-            return 9
-        return 5
-
-    def _sort_key(x: ProductTriageOut):
-        score = x.score.total_score if x.score else -1
-        return (
-            _decision_rank(x),
-            x.priority_rank,
-            -score,
-            -(x.created_at.timestamp() if x.created_at else 0),
-        )
+    # Ordenação estratégica: decisão + prioridade vêm do ORDER BY (com o mais
+    # recente primeiro); aqui só o score reordena dentro de cada grupo
+    # (sort estável, então empates continuam do mais recente ao mais antigo).
+    if not include_score:
+        return out
+
+    ranked: List[ProductTriageOut] = []
+    for _, group in groupby(zip(rows, out), key=lambda pair: (pair[0][3], pair[0][4])):
+        ranked.extend(sorted((item for _, item in group), key=_score_sort_key))
+    return ranked
+
 
-    out.sort(key=_sort_key)
-    return out
+def _score_sort_key(x: ProductTriageOut) -> int:
+    return -(x.score.total_score if x.score else -1)
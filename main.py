@@ -1,20 +1,24 @@
 # main.py
 
+from datetime import datetime
+
 from fastapi import FastAPI
+from sqlalchemy.schema import CreateIndex
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 
+from app.core.config import get_settings
 from app.core.database import engine, Base
 
-# Importa os models para registrá-los no Base.metadata
-from app.models.supplier import Supplier  # noqa: F401
-from app.models.ncm import Ncm  # noqa: F401
-from app.models.product import Product  # noqa: F401
-from app.models.product_evaluation import ProductEvaluation  # noqa: F401
-from app.models.import_simulation import ImportSimulation  # noqa: F401
-from app.models.import_operation import ImportOperation  # noqa: F401
+# Registra todos os models no Base.metadata (ver app/models/__init__.py)
+import app.models  # noqa: F401
 
 from app.api.product_decisions import router as product_decisions_router
 from app.api.products import router as products_router
+from app.schemas.product import ProductOut
+from app.schemas.score import ProductScoreOut
+from app.schemas.simulation import SimulationOut
+from app.services.exchange import close_http_client
 
 app = FastAPI(
     title="Manna Alive Import API",
@@ -35,9 +39,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# === Compressão: listas/ranking/export em JSON encolhem bem com gzip ===
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+def _warm_up_schemas() -> None:
+    """Valida um payload fictício em cada schema de resposta quente."""
+    now = datetime.utcnow()
+    ProductOut.model_validate({"id": 0, "name": "warmup", "created_at": now, "updated_at": now})
+    SimulationOut.model_validate(
+        {
+            "id": 0,
+            "product_id": 0,
+            "quantity": 1,
+            "exchange_rate": 1,
+            "fob_total_usd": 0,
+            "freight_total_usd": 0,
+            "insurance_total_usd": 0,
+            "customs_value_usd": 0,
+            "estimated_total_cost_usd": 0,
+            "estimated_total_cost_brl": 0,
+            "unit_cost_brl": 0,
+            "target_sale_price_brl": 1,
+            "estimated_margin_pct": 0,
+            "approved": False,
+            "created_at": now,
+        }
+    )
+    ProductScoreOut.model_validate(
+        {
+            "product_id": 0,
+            "product_name": "warmup",
+            "total_score": 0,
+            "demand_score": 0,
+            "competition_score": 0,
+            "margin_score": 0,
+            "risk_score": 0,
+            "classification": "descartar",
+            "notes": "",
+        }
+    )
+
+
+def _create_missing_indexes() -> None:
+    """
+    create_all não altera tabelas que já existem: índice novo num model só
+    chega a bancos antigos por aqui. IF NOT EXISTS torna o passo idempotente.
+    """
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    # Sem isto, cada boot inspeciona o banco (e cada worker pode disputar o DDL)
+    if get_settings().AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+        _create_missing_indexes()
+    _warm_up_schemas()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await close_http_client()
 
 
 app.include_router(products_router)
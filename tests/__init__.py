@@ -0,0 +1,10 @@
+# tests/__init__.py
+
+import os
+import tempfile
+
+# O engine é criado no import de app.core.database: os testes apontam para um
+# banco temporário antes de qualquer módulo importar a aplicação.
+_DB_DIR = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR.name}/test.db"
+os.environ["AUTO_CREATE_TABLES"] = "true"
@@ -0,0 +1,86 @@
+# tests/test_latest_rows.py
+
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from main import app
+from app.models.import_simulation import ImportSimulation
+from app.models.product import Product
+from app.models.product_decision import ProductDecision
+
+
+def _simulation(product_id: int, created_at: datetime, margin: float) -> ImportSimulation:
+    return ImportSimulation(
+        product_id=product_id,
+        quantity=100,
+        exchange_rate=5,
+        fob_total_usd=100,
+        freight_total_usd=10,
+        insurance_total_usd=1,
+        customs_value_usd=111,
+        estimated_total_cost_usd=150,
+        estimated_total_cost_brl=750,
+        unit_cost_brl=7.5,
+        target_sale_price_brl=20,
+        estimated_margin_pct=margin,
+        approved=False,
+        created_at=created_at,
+    )
+
+
+class LatestRowTieTest(unittest.TestCase):
+    """Duas linhas com o mesmo created_at: vale a de maior id (a última gravada)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+        cls.client.__enter__()  # roda o startup (create_all)
+
+        same_instant = datetime(2024, 1, 1, 12, 0, 0)
+        with SessionLocal() as db:
+            product = Product(name="Empate", fob_price_usd=1, freight_usd=1, insurance_usd=1)
+            db.add(product)
+            db.flush()
+            db.add(ProductDecision(
+                product_id=product.id, decision="reject", reason="primeira", created_at=same_instant,
+            ))
+            db.add(ProductDecision(
+                product_id=product.id, decision="approve_test", reason="segunda", created_at=same_instant,
+            ))
+            db.add(_simulation(product.id, same_instant, margin=10))
+            db.add(_simulation(product.id, same_instant, margin=55))
+            db.commit()
+            cls.product_id = product.id
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_last_decision(self):
+        resp = self.client.get(f"/products/{self.product_id}/decisions/last")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["decision"], "approve_test")
+
+    def test_last_simulation(self):
+        resp = self.client.get(f"/products/{self.product_id}/simulations/last")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["estimated_margin_pct"], 55)
+
+    def test_triage(self):
+        resp = self.client.get("/products/triage?limit=500")
+        self.assertEqual(resp.status_code, 200)
+        (item,) = [i for i in resp.json() if i["product_id"] == self.product_id]
+        self.assertEqual(item["latest_decision"]["decision"], "approve_test")
+        self.assertEqual(item["last_simulation"]["estimated_margin_pct"], 55)
+
+    def test_evaluation(self):
+        resp = self.client.get(f"/products/{self.product_id}/evaluation")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["header"]["latest_decision"]["decision"], "approve_test")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# tests/test_ranking_score.py
+
+import random
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from main import app
+from app.models.import_simulation import ImportSimulation
+from app.models.product import Product
+from app.models.product_market_data import ProductMarketData
+from app.services.scoring import (
+    compute_product_score,
+    compute_product_score_from_objs,
+    ranking_score_subquery,
+)
+
+# Valores que o REAL do SQLite guarda sem arredondar: empates exatos de meio
+# centavo (0.125), vizinhos de empate (2.675 é 2.67499...), limites de peso.
+_MARGINS = [2.675, 12.125, 37.125, 0.125, -0.125, 59.995, 10.005, 35.285, 45.625, 20.0, 52.0, 60.005]
+_WEIGHTS = [5.0005, 5.0004999999, 2.0005, 2.0625, 5.0, 1.9995, None]
+_FULL_RATIOS = [12.125, 40.005, 79.995, 0.375, 2.675, 20.0, None]
+
+
+class RankingScoreSqlTest(unittest.TestCase):
+    """total_score do banco = total_score do Python, e o ranking sai na ordem do sorted() do Python."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+        cls.client.__enter__()  # roda o startup (create_all)
+
+        rnd = random.Random(7)
+        with SessionLocal() as db:
+            for i in range(300):
+                product = Product(
+                    name=f"Ranking {i}",
+                    weight_kg=rnd.choice(_WEIGHTS + [rnd.uniform(0, 8)]),
+                    fragile=rnd.random() < 0.3,
+                    is_famous_brand=rnd.random() < 0.2,
+                    has_brand_authorization=rnd.random() < 0.5,
+                )
+                db.add(product)
+                db.flush()
+                if rnd.random() < 0.9:
+                    db.add(ProductMarketData(
+                        product_id=product.id,
+                        sales_per_day=rnd.choice([None, 0, 15, 75, 150, rnd.randint(0, 200)]),
+                        sales_per_month=rnd.choice([None, 0, 400, rnd.randint(0, 5000)]),
+                        visits=rnd.choice([None, 0, 1000, rnd.randint(0, 12000)]),
+                        full_ratio=rnd.choice(_FULL_RATIOS + [rnd.uniform(0, 90)]),
+                        competitor_count=rnd.choice([None, 0, 3, rnd.randint(0, 40)]),
+                        ranking_position=rnd.choice([None, 0, 1, rnd.randint(1, 60000)]),
+                    ))
+                for _ in range(rnd.randint(0, 2)):
+                    db.add(ImportSimulation(
+                        product_id=product.id,
+                        quantity=1,
+                        exchange_rate=5,
+                        fob_total_usd=1,
+                        freight_total_usd=1,
+                        customs_value_usd=1,
+                        estimated_total_cost_usd=1,
+                        estimated_total_cost_brl=1,
+                        unit_cost_brl=1,
+                        target_sale_price_brl=1,
+                        estimated_margin_pct=rnd.choice(_MARGINS + [rnd.uniform(-20, 70)]),
+                    ))
+            db.commit()
+
+        # Sessão nova: os objetos acima ainda têm os floats crus em memória
+        with SessionLocal() as db:
+            ids = db.scalars(select(Product.id).order_by(Product.id)).all()
+            cls.expected = [compute_product_score(db, pid)[0] for pid in ids]
+            ranking = ranking_score_subquery()
+            cls.sql_scores = dict(db.execute(select(ranking.c.product_id, ranking.c.total_score)).all())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def test_sql_total_score_matches_python(self):
+        for result in self.expected:
+            self.assertEqual(self.sql_scores[result["product_id"]], result["total_score"], result["product_id"])
+
+    def test_ranking_order(self):
+        # sorted() é estável: empates no score ficam na ordem de id
+        expected = [r["product_id"] for r in sorted(self.expected, key=lambda r: -r["total_score"])]
+        for limit in (1, 7, 50, 500):
+            resp = self.client.get(f"/products/scores/ranking?limit={limit}")
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual([r["product_id"] for r in resp.json()], expected[:limit])
+
+    def test_ranking_skips_failed_products_without_shrinking(self):
+        expected = [r["product_id"] for r in sorted(self.expected, key=lambda r: -r["total_score"])]
+        failing = set(expected[:3])
+
+        def flaky(product, market, simulation, **kwargs):
+            if product.id in failing:
+                raise ValueError("dados inconsistentes")
+            return compute_product_score_from_objs(product, market, simulation, **kwargs)
+
+        with mock.patch("app.api.products.compute_product_score_from_objs", side_effect=flaky):
+            resp = self.client.get("/products/scores/ranking?limit=10")
+        self.assertEqual([r["product_id"] for r in resp.json()], expected[3:13])
+
+
+if __name__ == "__main__":
+    unittest.main()